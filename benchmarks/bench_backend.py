@@ -0,0 +1,63 @@
+"""
+OpenAI-compatible backend against fake_llm.py: summarisation throughput with
+1 vs --concurrency requests in flight over pooled keep-alive connections, and
+time to first token when streaming. Also checks that summarise_rows and
+ideation run unchanged on the HTTP backend.
+
+Example:
+python benchmarks/bench_backend.py --prompts 64 --latency 0.2 --concurrency 8
+"""
+import argparse, json, os, pathlib, sys, tempfile, time
+from fake_llm import FakeLLM
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+os.environ["RA_DB_PATH"] = str(pathlib.Path(tempfile.mkdtemp()) / "bench_backend.db")
+
+
+def main(prompts, latency, token_latency, concurrency):
+    import config
+    from backends import OpenAIBackend
+
+    rows = [(f"2401.{i:05d}", f"We study problem {i} with method {i % 7}. " * 20)
+            for i in range(prompts)]
+    report = {"prompts": prompts, "latency": latency, "token_latency": token_latency}
+
+    with FakeLLM(latency, token_latency) as server:
+        config.LLM_BACKEND, config.LLM_URL, config.MODEL_NAME = "openai", server.url, "fake"
+        from summarise import summarise_rows, stream_summary
+
+        for n in (1, concurrency):
+            backend = OpenAIBackend("fake", url=server.url, concurrency=n)
+            t0 = time.perf_counter()
+            backend.generate([r[1] for r in rows], max_new_tokens=40)
+            dt = time.perf_counter() - t0
+            report[f"concurrency_{n}"] = {"seconds": round(dt, 2),
+                                          "prompts_per_s": round(prompts / dt, 1),
+                                          "connections": backend.stats["connections"]}
+
+        t0 = time.perf_counter()
+        first = None
+        for _ in stream_summary(rows[0][1]):
+            first = first or time.perf_counter() - t0
+        report["stream"] = {"ttft_s": round(first, 3), "total_s": round(time.perf_counter() - t0, 3)}
+
+        t0 = time.perf_counter()
+        summaries = summarise_rows(rows, batch_size=concurrency)
+        report["summarise_rows"] = {"summaries": len(summaries),
+                                    "seconds": round(time.perf_counter() - t0, 2)}
+        t0 = time.perf_counter()
+        summarise_rows(rows, batch_size=concurrency)
+        report["summarise_rows_cached_s"] = round(time.perf_counter() - t0, 3)
+        report["server"] = server.stats
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--prompts", type=int, default=64)
+    ap.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    ap.add_argument("--token-latency", type=float, default=0.005)
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+    main(args.prompts, args.latency, args.token_latency, args.concurrency)
@@ -0,0 +1,86 @@
+"""
+Concurrent readers and writers on one database: reader threads run
+rows_by_tag (like Streamlit sessions) while writer processes update
+summaries in small transactions (like workers). Reports queries per second
+and "database is locked" errors.
+
+Example:
+python benchmarks/bench_db.py --rows 20000 --readers 8 --writers 2 --seconds 10
+"""
+import argparse, json, multiprocessing, pathlib, sqlite3, tempfile, threading, time
+from synth import build
+
+
+def _writer(path, seconds, out):
+    import os
+    os.environ["RA_DB_PATH"] = str(path)
+    import config
+    config.DB_PATH = pathlib.Path(path)
+    from db import get_conn, set_summaries
+    conn = get_conn()
+    ids  = [pid for pid, in conn.execute("SELECT id FROM papers LIMIT 5000")]
+    done = errors = 0
+    end  = time.time() + seconds
+    while time.time() < end:
+        try:
+            with conn:
+                set_summaries(conn, [(f"summary {done}", pid) for pid in ids[done % 4950:done % 4950 + 50]])
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    out.put((done, errors))
+
+
+def main(rows, readers, writers, seconds):
+    path = pathlib.Path(tempfile.gettempdir()) / f"bench_db_{rows}.db"
+    build(path, rows)
+    from helpers import rows_by_tag
+
+    stats = {"reads": 0, "read_errors": 0}
+    lock  = threading.Lock()
+
+    def reader():
+        end = time.time() + seconds
+        n = err = 0
+        while time.time() < end:
+            try:
+                rows_by_tag("diffusion", 25)
+                n += 1
+            except sqlite3.OperationalError:
+                err += 1
+        with lock:
+            stats["reads"] += n
+            stats["read_errors"] += err
+
+    out   = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_writer, args=(path, seconds, out)) for _ in range(writers)]
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for p in procs:
+        p.start()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    report = {
+        "rows": rows, "readers": readers, "writers": writers, "seconds": seconds,
+        "reads_per_s": round(stats["reads"] / seconds, 1),
+        "read_errors": stats["read_errors"],
+        "write_tx_per_s": round(sum(d for d, _ in results) / seconds, 1),
+        "write_errors": sum(e for _, e in results),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--seconds", type=float, default=10)
+    args = ap.parse_args()
+    main(args.rows, args.readers, args.writers, args.seconds)
@@ -0,0 +1,95 @@
+"""
+Cold import time of the app, measured in a fresh interpreter with
+`python -X importtime`, and a check that nothing pulls in the heavy ML stack
+(torch, transformers, sentence-transformers, KeyBERT) at import time.
+
+"streamlit_app" is the app's whole import chain (everything
+src/streamlit_app.py imports, streamlit included, in one interpreter), which
+is what the first render waits for; it must stay within one total budget,
+--budget-ms. The other modules are reported one by one for finding the
+culprit, and fail only on errors or heavy imports. Exits with status 1 on any
+failure, so it can guard against regressions.
+
+Example:
+python benchmarks/bench_import.py --budget-ms 1000
+python benchmarks/bench_import.py --modules scrape ideate --budget-ms 1500
+"""
+import argparse, ast, json, os, pathlib, subprocess, sys, tempfile, time
+
+SRC     = pathlib.Path(__file__).resolve().parent.parent / "src"
+MODULES = ["scrape", "ideate", "summarise", "digest", "helpers", "search", "vectors",
+           "harvest", "worker", "jobs", "category_explorer", "query_builder"]
+HEAVY   = ["torch", "transformers", "sentence_transformers", "keybert", "llama_cpp"]
+
+PROBE = """
+import importlib, sys, time
+t0 = time.perf_counter()
+for module in {modules!r}:
+    importlib.import_module(module)
+print(round((time.perf_counter() - t0) * 1000, 1))
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def app_imports() -> list:
+    """
+    Modules imported at the top level of streamlit_app.py, in order. The app
+    itself is not imported: that would run the whole page.
+    """
+    tree = ast.parse((SRC / "streamlit_app.py").read_text())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def measure(modules) -> dict:
+    """
+    Import `modules` one after another in a fresh interpreter.
+    """
+    env = dict(os.environ, RA_DB_PATH=str(pathlib.Path(tempfile.mkdtemp()) / "import.db"))
+    t0  = time.perf_counter()
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                          PROBE.format(modules=list(modules), heavy=HEAVY)],
+                         cwd=SRC, env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    if out.returncode:
+        return {"error": out.stderr.strip().splitlines()[-1]}
+
+    import_ms, heavy = (out.stdout.splitlines() + [""])[-3:-1]
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    slowest = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            slowest.append((int(parts[1]), parts[2].strip()))
+    return {"import_ms": float(import_ms), "process_ms": round(wall, 1),
+            "heavy": [m for m in heavy.split(",") if m],
+            "slowest": [f"{n} {us / 1000:.0f}ms" for us, n in sorted(slowest, reverse=True)[:5]]}
+
+
+def main(modules, budget_ms):
+    report, failed = {}, []
+    r = report["streamlit_app"] = measure(app_imports())
+    if "error" in r or r["heavy"] or r["import_ms"] > budget_ms:
+        failed.append("streamlit_app")
+    for module in modules:
+        r = report[module] = measure([module])
+        if "error" in r or r["heavy"]:
+            failed.append(module)
+    report["budget_ms"] = budget_ms
+    report["failed"] = failed
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modules", nargs="+", default=MODULES)
+    ap.add_argument("--budget-ms", type=float, default=1000,
+                    help="allowed import time of the app's whole import chain")
+    args = ap.parse_args()
+    sys.exit(1 if main(args.modules, args.budget_ms)["failed"] else 0)
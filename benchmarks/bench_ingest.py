@@ -0,0 +1,97 @@
+"""
+Backfill throughput of the staged ingest pipeline (src/ingest.py) against a
+local fake arXiv API (fake_arxiv.py), compared with doing fetch, tag and
+write one after another in a single thread as scrape() does.
+
+Tagging uses the real encoder + KeyBERT with --real (needs
+sentence-transformers and KeyBERT), otherwise a CPU-bound stand-in costing
+--tag-ms per paper, so the run shows how the stages overlap and how the tag
+stage scales with processes.
+
+Example:
+python benchmarks/bench_ingest.py --papers 2000 --latency 0.2 --tag-ms 20 --procs 1 2 4
+python benchmarks/bench_ingest.py --papers 500 --real --procs 2 4
+"""
+import argparse, functools, json, pathlib, tempfile, time
+import numpy as np
+from fake_arxiv import FakeArxiv, CATEGORIES
+
+
+def busy_tagger(docs, ms: float = 20.0):
+    """
+    Stand-in for ingest.tag_batch: `ms` of pure-Python work per document,
+    random unit embeddings and fixed tags.
+    """
+    for doc in docs:
+        end = time.perf_counter() + ms / 1000
+        while time.perf_counter() < end:
+            sum(map(ord, doc[:200]))
+    embs = np.random.default_rng(len(docs)).standard_normal((len(docs), 384)).astype(np.float32)
+    return ["benchmark, tag"] * len(docs), embs / np.linalg.norm(embs, axis=1, keepdims=True)
+
+
+def sequential(queries, max_results, tagger) -> dict:
+    """
+    The scrape() shape: each page is fetched, tagged and written before the next.
+    """
+    from arxiv_api import iter_pages
+    from db import get_conn, existing_ids, insert_papers
+    from vectors import add_vectors, doc_text
+    conn, seen, added = get_conn(), set(), 0
+    t0 = time.perf_counter()
+    for query in queries:
+        for page in iter_pages(query, max_results=max_results, cache=False):
+            fresh  = [p for p in page if p.id not in seen]
+            seen.update(p.id for p in fresh)
+            stored = existing_ids(conn, (p.id for p in fresh))
+            fresh  = [p for p in fresh if p.id not in stored]
+            if not fresh:
+                continue
+            tags, embs = tagger([doc_text(p.title, p.summary) for p in fresh])
+            rows = [(p.id, p.title, ", ".join(p.authors), p.summary, p.published, None, t)
+                    for p, t in zip(fresh, tags)]
+            added += insert_papers(conn, rows, [p.categories for p in fresh])
+            add_vectors(conn, [p.id for p in fresh], embs)
+    dt = time.perf_counter() - t0
+    return {"papers": added, "seconds": round(dt, 2), "papers_per_s": round(added / dt, 1)}
+
+
+def main(papers, latency, rate, tag_ms, procs, fetch_threads, real):
+    import config
+    from ingest import ingest, tag_batch
+    config.ARXIV_RATE, config.ARXIV_BURST = rate, 4
+    tagger  = tag_batch if real else functools.partial(busy_tagger, ms=tag_ms)
+    queries = [f'cat:"{c}"' for c in CATEGORIES]
+    tmp     = pathlib.Path(tempfile.mkdtemp())
+    report  = {"papers": papers, "latency_s": latency, "rate_per_s": rate,
+               "tagger": "tag_batch" if real else f"busy_tagger ({tag_ms} ms/paper)", "runs": {}}
+
+    with FakeArxiv(papers=papers, latency=latency) as server:
+        config.ARXIV_API_URL = server.url
+        config.DB_PATH = tmp / "sequential.db"
+        report["runs"]["sequential"] = sequential(queries, papers, tagger)
+        for n in procs:
+            config.DB_PATH = tmp / f"ingest_{n}.db"
+            r = ingest(queries, papers, tagger=tagger, fetch_threads=fetch_threads, tag_procs=n)
+            report["runs"][f"pipeline_{n}_procs"] = r
+        report["requests"] = server.stats["requests"]
+
+    base = report["runs"]["sequential"]["papers_per_s"]
+    for name, r in report["runs"].items():
+        if name != "sequential":
+            r["speedup"] = round(r["write"]["papers_per_s"] / base, 1)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--papers", type=int, default=2000, help="papers served by the fake API")
+    ap.add_argument("--latency", type=float, default=0.2, help="fake server seconds per request")
+    ap.add_argument("--rate", type=float, default=20, help="API requests per second")
+    ap.add_argument("--tag-ms", type=float, default=20.0, help="stand-in tagging cost per paper")
+    ap.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--fetch-threads", type=int, default=4)
+    ap.add_argument("--real", action="store_true", help="tag with the encoder and KeyBERT")
+    args = ap.parse_args()
+    main(args.papers, args.latency, args.rate, args.tag_ms, args.procs, args.fetch_threads, args.real)
@@ -0,0 +1,67 @@
+"""
+End-to-end scrape latency against a local fake arXiv API (fake_arxiv.py).
+
+Measures the fetch stage on its own (rate limiter + paging + retries), the
+same fetch again from the SQLite response cache (no requests) and, with --full, the whole scrape() including tagging and inserts into a fresh
+temporary database. `old_sleep_seconds` is what the previous 1 s sleep per
+result alone would have added for the same number of results.
+
+Example:
+python benchmarks/bench_scrape.py --max-results 50 --rate 2 --latency 0.1 --fail-every 4
+python benchmarks/bench_scrape.py --max-results 50 --full
+"""
+import argparse, json, os, pathlib, tempfile, time
+from fake_arxiv import FakeArxiv
+
+os.environ["RA_DB_PATH"] = str(pathlib.Path(tempfile.mkdtemp()) / "bench_scrape.db")
+
+
+def main(max_results, rate, latency, fail_every, full):
+    import config
+    config.ARXIV_RATE = rate
+
+    with FakeArxiv(papers=max_results * 4, latency=latency, fail_every=fail_every) as server:
+        config.ARXIV_API_URL = server.url
+        from arxiv_api import iter_pages
+
+        t0 = time.perf_counter()
+        seen = sum(len(page) for page in iter_pages("all:*", max_results * 3, cache=False))
+        fetch_s = time.perf_counter() - t0
+        requests = server.stats["requests"]
+        sum(len(page) for page in iter_pages("all:*", max_results * 3))   # fills the cache
+        filled = server.stats["requests"]
+        t0 = time.perf_counter()
+        sum(len(page) for page in iter_pages("all:*", max_results * 3))
+        report = {
+            "max_results": max_results, "rate_per_s": rate, "latency_s": latency,
+            "fetch_seconds": round(fetch_s, 3),
+            "cached_fetch_seconds": round(time.perf_counter() - t0, 3),
+            "results_fetched": seen,
+            "old_sleep_seconds": seen,
+            "requests": requests,
+            "cached_requests": server.stats["requests"] - filled,
+            "injected_failures": server.stats["failures"],
+        }
+
+        if full:
+            from scrape import scrape
+            from arxiv_cache import clear
+            clear()
+            t0 = time.perf_counter()
+            added = scrape(max_results=max_results)
+            report["scrape_seconds"] = round(time.perf_counter() - t0, 3)
+            report["papers_added"]   = len(added)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-results", type=int, default=50)
+    ap.add_argument("--rate", type=float, default=1 / 3, help="API requests per second")
+    ap.add_argument("--latency", type=float, default=0.1, help="fake server latency (s)")
+    ap.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 503")
+    ap.add_argument("--full", action="store_true", help="also run scrape() (needs KeyBERT)")
+    args = ap.parse_args()
+    main(args.max_results, args.rate, args.latency, args.fail_every, args.full)
@@ -0,0 +1,46 @@
+"""
+Keyword lookup: FTS5 (search.search_papers) versus the old LOWER(tags) LIKE scan.
+
+Example:
+python benchmarks/bench_search.py --rows 100000
+"""
+import argparse, json, pathlib, tempfile
+from synth import build
+from timing import add_repeat, timed
+
+QUERIES = ["diffusion", "large language", "reinforcement learning", "graph", "protein"]
+
+
+def main(rows: int, repeat: int, limit: int):
+    path = pathlib.Path(tempfile.gettempdir()) / f"bench_search_{rows}.db"
+    build(path, rows)
+
+    from db import get_conn
+    from search import search_papers
+    conn = get_conn()
+
+    def like(kw):
+        return conn.execute(
+            "SELECT p.title, p.authors, unpack(t.summary), p.published FROM papers p "
+            "LEFT JOIN paper_text t ON t.paper_id = p.id "
+            "WHERE LOWER(p.tags) LIKE ? ORDER BY p.published DESC LIMIT ?",
+            (f"%{kw.lower()}%", limit)
+        ).fetchall()
+
+    report = {"rows": rows, "limit": limit, "queries": {}}
+    for kw in QUERIES:
+        report["queries"][kw] = {
+            "like_ms": timed(lambda: like(kw), repeat),
+            "fts_ms":  timed(lambda: search_papers(kw, limit, conn=conn), repeat),
+        }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    add_repeat(ap)
+    ap.add_argument("--limit", type=int, default=25)
+    args = ap.parse_args()
+    main(args.rows, args.repeat, args.limit)
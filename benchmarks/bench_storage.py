@@ -0,0 +1,134 @@
+"""
+Storage layout of abstracts and summaries: inline in `papers` (schema before
+migration 9) versus the compressed side table paper_text.
+
+A synthetic library is built in the old layout, measured, migrated with
+db.migrate (timed), vacuumed and measured again:
+
+- file_mb, plus papers_mb / text_mb / fts_mb per table (dbstat)
+- list_scan_ms: one pass over every row's title, authors and date, as the
+  list views and count_papers filters do
+- author_filter_ms: authors LIKE '%Turing%' over the whole table
+- digest_page_ms: 50 rows (id, title, authors, date) 200 pages deep, by keyset
+- text_lookup_ms: summaries of 1000 random papers (the rows being shown)
+- fts_ms: a full-text query joined back to titles
+
+Each timing is the median of --repeat runs on a fresh connection with
+SQLite's default 2 MB page cache and no mmap, so tables that don't fit are
+read from the OS cache rather than SQLite's. The synthetic text repeats a
+small vocabulary and compresses better than real abstracts.
+
+Example:
+python benchmarks/bench_storage.py --rows 1000000     # about 15 minutes
+RA_TEXT_CODEC=zstd python benchmarks/bench_storage.py --rows 100000
+"""
+import argparse, json, os, pathlib, random, sqlite3, tempfile, time
+from synth import fake_paper
+from timing import add_repeat, timed
+
+
+def build_old(path, rows: int, batch: int = 20000):
+    """
+    A library of `rows` papers at schema version 8, abstract and summary inline.
+    """
+    import db
+    conn = sqlite3.connect(path)
+    conn.create_function("arxiv_id", 1, db.normalise_id, deterministic=True)
+    conn.executescript(db.SCHEMA)
+    for stmt in (s for m in db.MIGRATIONS[:8] for s in m):
+        conn.execute(stmt)
+    conn.execute("PRAGMA user_version = 8")
+    conn.commit()
+    rng = random.Random(0)
+    for start in range(0, rows, batch):
+        with conn:
+            conn.executemany("INSERT INTO papers VALUES (?,?,?,?,?,?,?)",
+                             [fake_paper(i, rng) for i in range(start, min(start + batch, rows))])
+    conn.close()
+
+
+def vacuum(path):
+    import db
+    conn = sqlite3.connect(path)
+    conn.create_function("unpack", 1, db.unpack, deterministic=True)
+    conn.execute("VACUUM")
+    # papers has no INTEGER PRIMARY KEY: rowids may have moved under the index
+    conn.execute("INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')")
+    conn.commit()
+    conn.close()
+
+
+def measure(path, new: bool, repeat: int) -> dict:
+    import db
+
+    def connect():
+        conn = sqlite3.connect(path)
+        conn.create_function("unpack", 1, db.unpack, deterministic=True)
+        return conn
+
+    conn  = connect()
+    sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+    mb    = lambda *names: round(sum(sizes.get(n, 0) for n in names) / 2**20, 1)
+    ids   = [pid for pid, in conn.execute("SELECT id FROM papers")]
+    after = conn.execute("SELECT published, id FROM papers ORDER BY published DESC, id DESC "
+                         "LIMIT 1 OFFSET 9999").fetchone()
+    conn.close()
+    sample = random.Random(1).sample(ids, min(1000, len(ids)))
+    text   = (f"SELECT paper_id, unpack(summary) FROM paper_text "
+              f"WHERE paper_id IN ({','.join('?' * len(sample))})" if new else
+              f"SELECT id, summary FROM papers WHERE id IN ({','.join('?' * len(sample))})")
+    queries = {
+        "list_scan_ms":     ("SELECT title, authors, published FROM papers", ()),
+        "author_filter_ms": ("SELECT COUNT(*) FROM papers WHERE authors LIKE '%Turing%'", ()),
+        "digest_page_ms":   ("SELECT id, title, authors, published FROM papers "
+                             "WHERE (published, id) < (?, ?) "
+                             "ORDER BY published DESC, id DESC LIMIT 50", after),
+        "text_lookup_ms":   (text, sample),
+        "fts_ms":           ("SELECT p.title FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid "
+                             "WHERE papers_fts MATCH 'protein' ORDER BY bm25(papers_fts) LIMIT 25", ()),
+    }
+    out = {"file_mb": round(os.path.getsize(path) / 2**20, 1),
+           "papers_mb": mb("papers", "sqlite_autoindex_papers_1"),
+           "text_mb": mb("paper_text", "sqlite_autoindex_paper_text_1") if new else None,
+           "fts_mb": mb(*(n for n in sizes if n.startswith("papers_fts")))}
+    for name, (sql, args) in queries.items():
+        def run():
+            conn = connect()
+            conn.execute(sql, args).fetchall()
+            conn.close()
+        out[name] = timed(run, repeat)
+    return out
+
+
+def main(rows: int, repeat: int):
+    path = pathlib.Path(tempfile.mkdtemp()) / "storage.db"
+    os.environ["RA_DB_PATH"] = str(path)
+    import config
+    import db
+    config.DB_PATH = path
+
+    t0 = time.perf_counter()
+    build_old(str(path), rows)
+    vacuum(str(path))
+    report = {"rows": rows, "codec": config.TEXT_CODEC,
+              "build_s": round(time.perf_counter() - t0, 1),
+              "before": measure(str(path), False, repeat)}
+
+    t0 = time.perf_counter()
+    db.get_conn()                       # applies migration 9
+    db.close_all()
+    report["migrate_s"] = round(time.perf_counter() - t0, 1)
+    vacuum(str(path))
+    report["after"] = measure(str(path), True, repeat)
+    report["ratio"] = {k: round(report["after"][k] / v, 2)
+                       for k, v in report["before"].items() if v and report["after"][k] is not None}
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000000)
+    add_repeat(ap)
+    args = ap.parse_args()
+    main(args.rows, args.repeat)
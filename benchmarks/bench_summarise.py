@@ -0,0 +1,75 @@
+"""
+Concurrent summarisation against fake_llm.py: papers per second of
+summarise_rows_async for increasing numbers of requests in flight, with
+server-side latency and injected 503s (retried with backoff), committing
+results as they complete. Ends with a `worker.py --once --concurrency`
+style run through the job queue.
+
+Example:
+python benchmarks/bench_summarise.py --papers 200 --latency 0.5 --concurrency 1 8 32
+"""
+import argparse, asyncio, json, pathlib, tempfile, time
+from synth import build
+from fake_llm import FakeLLM
+
+
+def main(papers, latency, token_latency, concurrency, fail_every):
+    path = pathlib.Path(tempfile.mkdtemp()) / "bench_summarise.db"
+    build(path, papers)
+    import config
+    from db import get_conn, set_summaries
+    from llm_cache import clear
+
+    conn   = get_conn()
+    report = {"papers": papers, "latency": latency, "token_latency": token_latency,
+              "fail_every": fail_every, "runs": {}}
+
+    def reset():
+        with conn:
+            conn.execute("UPDATE paper_text SET summary=NULL")
+            conn.execute("DELETE FROM summary_jobs")
+        clear()
+
+    def write(done):
+        with conn:
+            set_summaries(conn, done)
+
+    with FakeLLM(latency, token_latency, fail_every) as server:
+        config.LLM_BACKEND, config.LLM_URL, config.MODEL_NAME = "openai", server.url, "fake"
+        config.LLM_BACKOFF = 0.05
+        from summarise import summarise_rows_async
+        from worker import run
+
+        for c in concurrency:
+            reset()
+            rows = conn.execute("SELECT paper_id, unpack(abstract) FROM paper_text").fetchall()
+            t0   = time.perf_counter()
+            results, failures = asyncio.run(summarise_rows_async(rows, c, on_results=write))
+            dt   = time.perf_counter() - t0
+            report["runs"][c] = {
+                "seconds": round(dt, 2), "papers_per_s": round(len(results) / dt, 1),
+                "failed": len(failures),
+                "stored": conn.execute("SELECT COUNT(*) FROM papers WHERE summarised").fetchone()[0],
+            }
+        base = report["runs"][concurrency[0]]["papers_per_s"]
+        for c in concurrency:
+            report["runs"][c]["speedup"] = round(report["runs"][c]["papers_per_s"] / base, 1)
+
+        reset()
+        t0 = time.perf_counter()
+        done = run(batch_size=16, once=True, concurrency=max(concurrency))
+        report["worker_once"] = {"summaries": done, "seconds": round(time.perf_counter() - t0, 2)}
+        report["server"] = server.stats
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--papers", type=int, default=200)
+    ap.add_argument("--latency", type=float, default=0.5, help="server seconds per request")
+    ap.add_argument("--token-latency", type=float, default=0.0)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--fail-every", type=int, default=10, help="answer every n-th request with 503")
+    args = ap.parse_args()
+    main(args.papers, args.latency, args.token_latency, args.concurrency, args.fail_every)
@@ -0,0 +1,52 @@
+"""
+CPU tagging throughput: per-paper make_tags versus batched make_tags_batch
+with shared document embeddings. Needs sentence-transformers and KeyBERT
+(the model is downloaded on first run); runs on CPU only.
+
+Example:
+python benchmarks/bench_tagging.py --papers 256 --batch-size 64
+"""
+import argparse, json, os, random, time
+os.environ["CUDA_VISIBLE_DEVICES"] = ""            # CPU-only numbers
+from synth import fake_paper
+
+
+def main(papers: int, batch_size: int, per_paper: int):
+    from models import get_encoder
+    from scrape import make_tags, make_tags_batch
+    from vectors import doc_text
+
+    rng  = random.Random(0)
+    rows = [fake_paper(i, rng) for i in range(papers)]
+    docs = [doc_text(r[1], r[3]) for r in rows]
+    make_tags_batch(docs[:2])                         # warm up
+
+    t0 = time.perf_counter()
+    for r in rows[:per_paper]:
+        make_tags(r[1], r[3])
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for start in range(0, papers, batch_size):
+        chunk = docs[start:start + batch_size]
+        embs  = get_encoder().encode(chunk, batch_size=batch_size, normalize_embeddings=True)
+        make_tags_batch(chunk, embs)
+    batch_s = time.perf_counter() - t0
+
+    report = {
+        "papers": papers, "batch_size": batch_size,
+        "per_paper_papers_per_s": round(per_paper / single_s, 2),
+        "batched_papers_per_s":   round(papers / batch_s, 2),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--papers", type=int, default=256)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--per-paper", type=int, default=32,
+                    help="papers to tag one at a time for the baseline")
+    args = ap.parse_args()
+    main(args.papers, args.batch_size, args.per_paper)
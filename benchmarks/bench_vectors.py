@@ -0,0 +1,50 @@
+"""
+Top-k cosine search over the memory-mapped embedding file (vectors.py).
+Uses random unit vectors, so no embedding model is needed.
+
+Example:
+python benchmarks/bench_vectors.py --rows 500000
+"""
+import argparse, json, pathlib, tempfile, time
+import numpy as np
+from synth import build
+from timing import add_repeat, timed
+
+
+def main(rows: int, repeat: int, k: int):
+    path = pathlib.Path(tempfile.gettempdir()) / f"bench_vectors_{rows}.db"
+    build(path, rows)
+
+    import vectors
+    from db import get_conn
+    conn = get_conn()
+    rng  = np.random.default_rng(0)
+    have = conn.execute("SELECT COUNT(*) FROM paper_vectors").fetchone()[0]
+    ids  = [pid for pid, in conn.execute("SELECT id FROM papers ORDER BY rowid")]
+
+    t0 = time.perf_counter()
+    for start in range(have, rows, 50000):
+        chunk = ids[start:start + 50000]
+        vectors.add_vectors(conn, chunk, rng.standard_normal((len(chunk), vectors.DIM)))
+    add_s = time.perf_counter() - t0
+
+    queries = iter(rng.standard_normal((repeat, vectors.DIM)))
+    search  = timed(lambda: vectors.search_vectors(next(queries), k, conn), repeat)
+
+    report = {
+        "rows": rows, "k": k,
+        "index_mb": round(vectors.vec_path().stat().st_size / 2**20, 1),
+        "add_seconds": round(add_s, 2),
+        "search_ms_median": search,
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=500000)
+    add_repeat(ap, 10)
+    ap.add_argument("-k", type=int, default=10)
+    args = ap.parse_args()
+    main(args.rows, args.repeat, args.k)
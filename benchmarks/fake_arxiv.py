@@ -0,0 +1,129 @@
+"""
+Local stand-in for the arXiv Atom API (export.arxiv.org/api/query).
+
+Serves `papers` synthetic entries, paged by `start` / `max_results` and
+filtered by `id_list` or a `cat:"..."` search query, with optional per-request latency and injected
+HTTP 503 responses (with Retry-After) to exercise backoff.
+
+Example:
+with FakeArxiv(papers=500, latency=0.2, fail_every=5) as server:
+    config.ARXIV_API_URL = server.url
+    ...
+"""
+import random, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+from synth import fake_paper
+
+ENTRY = """<entry>
+<id>http://arxiv.org/abs/{id}v{version}</id>
+<published>{published}Z</published>
+<updated>{published}Z</updated>
+<title>{title}</title>
+<summary>{abstract}</summary>
+{authors}
+{categories}
+</entry>"""
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" xmlns:arxiv="http://arxiv.org/schemas/atom">
+<title>ArXiv Query</title>
+<opensearch:totalResults>{total}</opensearch:totalResults>
+<opensearch:startIndex>{start}</opensearch:startIndex>
+<opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>
+{entries}
+</feed>"""
+
+CATEGORIES = ["cs.CL", "cs.LG", "cs.AI", "cs.CV", "stat.ML"]
+
+
+def atom_entry(row, rng, version: int = 1, cats=None) -> str:
+    pid, title, authors, abstract, published, _, _ = row
+    cats = cats or rng.sample(CATEGORIES, 2)
+    return ENTRY.format(
+        id=pid, version=version, published=published[:19],
+        title=escape(title), abstract=escape(abstract),
+        authors="\n".join(f"<author><name>{escape(a)}</name></author>"
+                          for a in authors.split(", ")),
+        categories="\n".join(f'<category term="{c}" scheme="http://arxiv.org/schemas/atom"/>'
+                             for c in cats),
+    )
+
+
+class FakeArxiv:
+    """
+    Threaded HTTP server on 127.0.0.1 with a random free port.
+    `stats` counts requests and injected failures.
+    """
+    def __init__(self, papers: int = 1000, latency: float = 0.0,
+                 fail_every: int = 0, retry_after: int = 0, seed: int = 0):
+        rng = random.Random(seed)
+        # newest first, like sortBy=submittedDate&sortOrder=descending
+        rows          = [fake_paper(i, rng) for i in range(papers)][::-1]
+        self.cats     = [rng.sample(CATEGORIES, 2) for _ in rows]
+        self.entries  = [atom_entry(r, rng, cats=c) for r, c in zip(rows, self.cats)]
+        self.by_id    = {r[0]: e for r, e in zip(rows, self.entries)}
+        self.latency  = latency
+        self.fail_every, self.retry_after = fail_every, retry_after
+        self.stats    = {"requests": 0, "failures": 0}
+        self.lock     = threading.Lock()
+        self.server   = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url      = f"http://127.0.0.1:{self.server.server_port}/api/query"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.stats["requests"] += 1
+                    n = fake.stats["requests"]
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.fail_every and n % fake.fail_every == 0:
+                    with fake.lock:
+                        fake.stats["failures"] += 1
+                    self.send_response(503)
+                    self.send_header("Retry-After", str(fake.retry_after))
+                    self.end_headers()
+                    return
+
+                q     = parse_qs(urlparse(self.path).query)
+                start = int(q.get("start", ["0"])[0])
+                count = int(q.get("max_results", ["10"])[0])
+                if q.get("id_list", [""])[0]:
+                    ids = [re.sub(r"v\d+$", "", i) for i in q["id_list"][0].split(",")]
+                    entries = [fake.by_id[i] for i in ids if i in fake.by_id]
+                elif re.search(r'cat:"([^"]+)"', q.get("search_query", [""])[0]):
+                    cat = re.search(r'cat:"([^"]+)"', q["search_query"][0]).group(1)
+                    entries = [e for e, c in zip(fake.entries, fake.cats) if cat in c]
+                else:
+                    entries = fake.entries
+                page = entries[start:start + count]
+                body = FEED.format(total=len(entries), start=start, count=len(page),
+                                   entries="\n".join(page)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    with FakeArxiv() as server:
+        print(f"serving {len(server.entries)} papers at {server.url}")
+        threading.Event().wait()
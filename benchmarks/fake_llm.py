@@ -0,0 +1,113 @@
+"""
+Local stand-in for an OpenAI-compatible completions server (vLLM, llama.cpp
+server) to exercise backends.OpenAIBackend without a model.
+
+POST /v1/completions answers with deterministic "bullet points" made from the
+prompt's words, after `latency` seconds (prefill) plus `token_latency` per
+generated token; "stream": true sends them as server-sent events. Keep-alive
+connections are supported, and `stats` counts requests, connections and the
+peak number of requests served at once. `fail_every` answers every n-th
+request with 503.
+
+Example:
+with FakeLLM(latency=0.2, token_latency=0.01) as server:
+    backend = OpenAIBackend("fake", url=server.url)
+    ...
+"""
+import json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_completion(prompt: str, max_tokens: int):
+    words = prompt.split()[-40:] or ["empty"]
+    out   = []
+    for i in range(min(max_tokens, 60)):
+        out.append(("\n- " if i % 12 == 0 else " ") + words[(i * 7) % len(words)])
+    return out
+
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0, fail_every: int = 0):
+        self.latency, self.token_latency, self.fail_every = latency, token_latency, fail_every
+        self.stats  = {"requests": 0, "connections": 0, "failures": 0, "peak_concurrency": 0}
+        self.active = 0
+        self.lock   = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url    = f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"        # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.stats["connections"] += 1
+
+            def _send(self, status, body: bytes, ctype="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake.lock:
+                    fake.stats["requests"] += 1
+                    n = fake.stats["requests"]
+                    fake.active += 1
+                    fake.stats["peak_concurrency"] = max(fake.stats["peak_concurrency"], fake.active)
+                try:
+                    if fake.fail_every and n % fake.fail_every == 0:
+                        with fake.lock:
+                            fake.stats["failures"] += 1
+                        return self._send(503, b'{"error": "overloaded"}')
+                    tokens = fake_completion(body.get("prompt", ""), body.get("max_tokens", 16))
+                    time.sleep(fake.latency)
+                    if not body.get("stream"):
+                        time.sleep(fake.token_latency * len(tokens))
+                        out = {"object": "text_completion", "model": body.get("model"),
+                               "choices": [{"index": 0, "text": "".join(tokens),
+                                            "finish_reason": "length"}]}
+                        return self._send(200, json.dumps(out).encode())
+
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for tok in tokens:
+                        time.sleep(fake.token_latency)
+                        event = {"choices": [{"index": 0, "text": tok, "finish_reason": None}]}
+                        self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                    self._chunk(b"data: [DONE]\n\n")
+                    self._chunk(b"")
+                finally:
+                    with fake.lock:
+                        fake.active -= 1
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    with FakeLLM(latency=0.1, token_latency=0.01) as server:
+        print(f"OpenAI-compatible stub at {server.url}")
+        threading.Event().wait()
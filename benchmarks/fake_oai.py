@@ -0,0 +1,119 @@
+"""
+Local stand-in for arXiv's OAI-PMH endpoint (ListRecords, metadataPrefix=arXiv).
+
+Serves synthetic records in sets "cs" and "stat", honours `from`, pages with
+resumption tokens, and can add latency or answer 503 + Retry-After to exercise
+flow control.
+
+Example:
+with FakeOAI(records=20000, page_size=1000) as server:
+    config.OAI_URL = server.url
+    harvest.harvest(["cs.CL", "cs.LG"], since="2020-01-01")
+"""
+import datetime, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+from synth import fake_paper
+
+SETS = {"cs": ["cs.CL", "cs.LG", "cs.AI", "cs.CV", "cs.IR"], "stat": ["stat.ML", "stat.ME"]}
+
+RECORD = """<record><header><identifier>oai:arXiv.org:{id}</identifier>
+<datestamp>{datestamp}</datestamp><setSpec>{set}</setSpec></header>
+<metadata><arXiv xmlns="http://arxiv.org/OAI/arXiv/">
+<id>{id}</id><created>{created}</created>
+<authors>{authors}</authors>
+<title>{title}</title><categories>{categories}</categories>
+<abstract>{abstract}</abstract>
+</arXiv></metadata></record>"""
+
+RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/">
+<responseDate>{date}T00:00:00Z</responseDate>
+{body}
+</OAI-PMH>"""
+
+
+class FakeOAI:
+    """
+    Threaded OAI-PMH server on 127.0.0.1 with a random free port.
+    `stats` counts requests, records served and injected failures.
+    """
+    def __init__(self, records: int = 5000, page_size: int = 1000, latency: float = 0.0,
+                 fail_every: int = 0, seed: int = 0, today: str = "2024-07-01"):
+        rng = random.Random(seed)
+        self.records = []
+        for i in range(records):
+            pid, title, authors, abstract, published, _, _ = fake_paper(i, rng)
+            set_spec = rng.choice(list(SETS))
+            cats     = rng.sample(SETS[set_spec], 2)
+            stamp    = (datetime.date(2024, 1, 1) + datetime.timedelta(days=i * 180 // records)).isoformat()
+            self.records.append((set_spec, stamp, RECORD.format(
+                id=pid, datestamp=stamp, set=set_spec, created=published[:10],
+                authors="".join(f"<author><keyname>{escape(a.split(' ')[-1])}</keyname>"
+                                f"<forenames>{escape(a.split(' ')[0])}</forenames></author>"
+                                for a in authors.split(", ")),
+                title=escape(title), categories=" ".join(cats), abstract=escape(abstract),
+            )))
+        self.page_size, self.latency, self.fail_every, self.today = page_size, latency, fail_every, today
+        self.stats  = {"requests": 0, "records": 0, "failures": 0}
+        self.lock   = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url    = f"http://127.0.0.1:{self.server.server_port}/oai"
+
+    def list_records(self, q):
+        if "resumptionToken" in q:
+            set_spec, from_date, offset = q["resumptionToken"][0].split("|")
+            offset = int(offset)
+        else:
+            set_spec, from_date, offset = q.get("set", [""])[0], q.get("from", ["0000"])[0], 0
+        match = [r for s, d, r in self.records if s == set_spec and d >= from_date]
+        if not match:
+            return '<error code="noRecordsMatch">no records</error>', 0
+        page  = match[offset:offset + self.page_size]
+        nxt   = offset + len(page)
+        token = f"{set_spec}|{from_date}|{nxt}" if nxt < len(match) else ""
+        body  = ("<ListRecords>" + "\n".join(page) +
+                 f'<resumptionToken cursor="{offset}" completeListSize="{len(match)}">{token}'
+                 "</resumptionToken></ListRecords>")
+        return body, len(page)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with fake.lock:
+                    fake.stats["requests"] += 1
+                    n = fake.stats["requests"]
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.fail_every and n % fake.fail_every == 0:
+                    with fake.lock:
+                        fake.stats["failures"] += 1
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                body, count = fake.list_records(parse_qs(urlparse(self.path).query))
+                with fake.lock:
+                    fake.stats["records"] += count
+                data = RESPONSE.format(date=fake.today, body=body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/xml")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,220 @@
+"""
+Offline benchmark suite for the scrape -> tag -> summarise -> ideate pipeline.
+
+For every size in --sizes a synthetic library is built (synth.py, cached in
+the temp directory) and measured:
+
+- rows_by_tag: keyword lookups (median ms)
+- build_html: first page and the whole digest streamed to a file
+- digest paging: a page 200 pages deep by OFFSET and by keyset cursor (page_rows)
+- render_rows: 25 and 1000 rows, and a page of 50 again from the fragment cache
+- scrape dedup/insert: existing_ids per 100-paper page and insert_papers rows/s
+- make_tags: batched tagging papers/s (skipped without sentence-transformers/KeyBERT)
+
+and once, on the smallest library, summarise and ideate latency (cold and
+cached) against the stub server fake_llm.py, or a tiny in-process model with
+--backend tiny. Results are written as JSON with the commit they were run
+on; --compare prints the change of every timing between two result files.
+
+Example:
+python benchmarks/suite.py --sizes 1000 100000 --out results/$(git rev-parse --short HEAD).json
+python benchmarks/suite.py --sizes 1000000          # about 10 minutes to build once
+python benchmarks/suite.py --compare results/old.json results/new.json
+"""
+import argparse, importlib.util, json, os, pathlib, platform, random
+import subprocess, sys, tempfile, time
+from synth import build, fake_paper
+from timing import add_repeat, timed
+
+QUERIES   = ["diffusion", "large language", "reinforcement learning", "graph", "protein"]
+TINY_MODEL = "HuggingFaceTB/SmolLM2-135M-Instruct"
+
+
+def bench_library(rows: int, repeat: int) -> dict:
+    path = pathlib.Path(tempfile.gettempdir()) / f"bench_suite_{rows}.db"
+    t0 = time.perf_counter()
+    build(path, rows)
+    build_s = time.perf_counter() - t0
+
+    from db import get_conn, existing_ids, insert_papers
+    from helpers import rows_by_tag, render_rows
+    from digest import build_html, page_rows, write_html
+    conn = get_conn()
+    out  = {"build_s": round(build_s, 1)}
+
+    out["rows_by_tag_ms"] = {kw: timed(lambda: rows_by_tag(kw, 25), repeat) for kw in QUERIES}
+
+    everything = dict(lookback_hours=24 * 365 * 50)
+    out["build_html_page_ms"] = timed(lambda: "".join(build_html(**everything, limit=50)), repeat)
+    html_file = path.with_suffix(".html")
+    t0 = time.perf_counter()
+    n  = write_html(html_file, **everything)
+    dt = time.perf_counter() - t0
+    out["build_html_full"] = {"papers": n, "seconds": round(dt, 2),
+                              "papers_per_s": round(n / dt, 1),
+                              "mb": round(html_file.stat().st_size / 2**20, 1)}
+    html_file.unlink()
+
+    deep  = min(200, rows // 50 - 1) * 50
+    after = conn.execute("SELECT published, id FROM papers ORDER BY published DESC, id DESC "
+                         "LIMIT 1 OFFSET ?", (deep - 1,)).fetchone() if deep > 0 else None
+    out["digest_deep_page_ms"] = {
+        "offset": timed(lambda: "".join(build_html(**everything, limit=50, offset=deep)), repeat),
+        "keyset": timed(lambda: page_rows(**everything, limit=50, after=after), repeat)}
+
+    sample = conn.execute("SELECT p.title, p.authors, unpack(t.summary), p.published FROM papers p "
+                          "LEFT JOIN paper_text t ON t.paper_id = p.id LIMIT 1000").fetchall()
+    page, _ = page_rows(**everything, limit=50)
+    render_rows(page)
+    out["render_rows_ms"] = {"25": timed(lambda: render_rows(sample[:25]), repeat),
+                             "1000": timed(lambda: render_rows(sample), repeat),
+                             "50_cached": timed(lambda: render_rows(page), repeat)}
+
+    # scrape stages 1 and 3 without the network: pages of 100 ids, half already stored
+    rng   = random.Random(1)
+    fresh = [fake_paper(rows + 10**6 + i, rng) for i in range(2000)]
+    old   = [pid for pid, in conn.execute("SELECT id FROM papers ORDER BY random() LIMIT 1000")]
+    pages = [old[i:i + 50] + [r[0] for r in fresh[i:i + 50]] for i in range(0, 1000, 50)]
+    t0 = time.perf_counter()
+    for page in pages:
+        existing_ids(conn, page)
+    out["scrape_dedup_ms_per_page"] = round((time.perf_counter() - t0) * 1000 / len(pages), 2)
+    t0 = time.perf_counter()
+    for i in range(0, len(fresh), 100):
+        insert_papers(conn, fresh[i:i + 100], [["cs.LG", "cs.CL"]] * len(fresh[i:i + 100]))
+    out["scrape_insert_rows_per_s"] = round(len(fresh) / (time.perf_counter() - t0), 1)
+    with conn:                                  # keep the cached library at `rows`
+        conn.executemany("DELETE FROM papers WHERE id=?", [(r[0],) for r in fresh])
+    return out
+
+
+def bench_tagging(papers: int = 64) -> dict:
+    if not (importlib.util.find_spec("sentence_transformers") and importlib.util.find_spec("keybert")):
+        return {"skipped": "sentence-transformers / keybert not installed"}
+    from models import get_encoder
+    from scrape import make_tags_batch
+    from vectors import doc_text
+    rng  = random.Random(0)
+    docs = [doc_text(r[1], r[3]) for r in (fake_paper(i, rng) for i in range(papers))]
+    make_tags_batch(docs[:2])                   # load the models
+    t0   = time.perf_counter()
+    embs = get_encoder().encode(docs, batch_size=32, normalize_embeddings=True)
+    make_tags_batch(docs, embs)
+    return {"papers": papers, "papers_per_s": round(papers / (time.perf_counter() - t0), 2)}
+
+
+def bench_llm(backend: str) -> dict:
+    import config
+    from db import get_conn
+    from llm_cache import clear
+
+    def run():
+        from summarise import summarise_rows, stream_summary
+        from ideate import ideate_from_topic
+        rows = get_conn().execute("SELECT paper_id, unpack(abstract) FROM paper_text LIMIT 8").fetchall()
+        res  = {}
+        clear()
+        t0 = time.perf_counter()
+        summarise_rows(rows)
+        res["summarise_8_cold_s"] = round(time.perf_counter() - t0, 3)
+        res["summarise_8_cached_ms"] = timed(lambda: summarise_rows(rows), 3)
+        clear()
+        t0, first = time.perf_counter(), None
+        for _ in stream_summary(rows[0][1]):
+            first = first or time.perf_counter() - t0
+        res["summary_ttft_s"]  = round(first or 0, 3)
+        res["summary_total_s"] = round(time.perf_counter() - t0, 3)
+        t0 = time.perf_counter()
+        ideate_from_topic("diffusion")
+        res["ideate_cold_s"]    = round(time.perf_counter() - t0, 3)
+        res["ideate_cached_ms"] = timed(lambda: ideate_from_topic("diffusion"), 3)
+        clear()
+        return res
+
+    if backend == "tiny":
+        if not importlib.util.find_spec("transformers"):
+            return {"skipped": "transformers not installed"}
+        config.LLM_BACKEND, config.MODEL_NAME = "transformers", TINY_MODEL
+        return {"backend": f"transformers:{TINY_MODEL}", **run()}
+
+    from fake_llm import FakeLLM
+    with FakeLLM(latency=0.05, token_latency=0.002) as server:
+        config.LLM_BACKEND, config.LLM_URL, config.MODEL_NAME = "openai", server.url, "fake"
+        return {"backend": "stub (fake_llm.py, 50ms + 2ms/token)", **run()}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=pathlib.Path(__file__).parent).stdout.strip()
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def main(sizes, repeat, backend, out=None):
+    report = {"env": environment(), "libraries": {}}
+    for rows in sorted(sizes):
+        report["libraries"][str(rows)] = bench_library(rows, repeat)
+        print(f"[suite] {rows} rows done", file=sys.stderr)
+    build(pathlib.Path(tempfile.gettempdir()) / f"bench_suite_{min(sizes)}.db", min(sizes))
+    report["make_tags"] = bench_tagging()
+    report["llm"]       = bench_llm(backend)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if out:
+        pathlib.Path(out).parent.mkdir(parents=True, exist_ok=True)
+        pathlib.Path(out).write_text(text)
+    return report
+
+
+def _flatten(d, prefix=""):
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            yield from _flatten(v, key + ".")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield key, v
+
+
+def compare(old_path, new_path, tolerance: float = 0.2) -> dict:
+    """
+    Relative change of every timing between two suite results. Metrics ending
+    in _per_s are better when higher, all other timings when lower; changes
+    for the worse beyond `tolerance` are listed as regressions.
+    """
+    old = json.loads(pathlib.Path(old_path).read_text())
+    new = json.loads(pathlib.Path(new_path).read_text())
+    a, b = dict(_flatten(old)), dict(_flatten(new))
+    changes, regressions = {}, []
+    for key in sorted(a.keys() & b.keys()):
+        if key.startswith("env.") or not a[key] or key.endswith((".papers", ".mb", "build_s")):
+            continue
+        ratio = b[key] / a[key]
+        changes[key] = round(ratio, 2)
+        worse = ratio < 1 - tolerance if key.endswith("per_s") else ratio > 1 + tolerance
+        if worse:
+            regressions.append(key)
+    report = {"old": old.get("env", {}).get("commit"), "new": new.get("env", {}).get("commit"),
+              "ratio_new_over_old": changes, "regressions": regressions}
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Offline benchmark suite.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000],
+                    help="library sizes in rows (1000000 for the large run)")
+    add_repeat(ap)
+    ap.add_argument("--backend", choices=["stub", "tiny"], default="stub",
+                    help="LLM for summarise/ideate: local stub server or a tiny CPU model")
+    ap.add_argument("--out", help="also write the JSON report here")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                    help="compare two reports instead of running")
+    args = ap.parse_args()
+    if args.compare:
+        sys.exit(1 if compare(*args.compare)["regressions"] else 0)
+    main(args.sizes, args.repeat, args.backend, args.out)
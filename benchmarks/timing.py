@@ -0,0 +1,30 @@
+"""
+Timing helpers shared by the benchmarks.
+
+Example:
+ap = argparse.ArgumentParser()
+add_repeat(ap)
+args = ap.parse_args()
+timed(lambda: search_papers("graph"), args.repeat)    # median in ms
+"""
+import statistics, time
+
+
+def timed(fn, repeat: int = 5) -> float:
+    """
+    Median wall time of fn() over `repeat` runs, in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return round(statistics.median(times) * 1000, 2)
+
+
+def add_repeat(ap, default: int = 5):
+    """
+    The --repeat option of a benchmark's argument parser.
+    """
+    ap.add_argument("--repeat", type=int, default=default,
+                    help="runs per timing, the median is reported")
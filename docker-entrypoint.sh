@@ -0,0 +1,32 @@
+#!/bin/sh
+# Runs the app and the summarisation workers in one container. The Digest tab
+# only queues jobs (jobs.py) and a worker generates the summaries:
+#
+# - RA_LLM_BACKEND=openai: the model lives in the inference server, so start
+#   RA_WORKERS (default 1) src/worker.py processes next to Streamlit,
+#   restarted if they exit.
+# - in-process backends (transformers, llamacpp): a worker process would load
+#   its own copy of the model next to the app's, so none are started; the app
+#   summarises queued jobs in a thread sharing its model (config.APP_WORKER).
+#
+# Extra arguments are passed to streamlit run.
+set -e
+
+workers="${RA_WORKERS:-1}"
+if [ "${RA_LLM_BACKEND:-transformers}" != "openai" ] && [ "$workers" -gt 0 ]; then
+    [ -n "${RA_WORKERS:-}" ] && echo "[entrypoint] RA_WORKERS=$RA_WORKERS ignored:" \
+        "backend ${RA_LLM_BACKEND:-transformers} runs in-process, the app summarises itself" >&2
+    workers=0
+fi
+
+for i in $(seq "$workers"); do
+    (
+        while true; do
+            python src/worker.py ${RA_WORKER_ARGS:-} || true
+            echo "[entrypoint] worker $i exited; restarting in 5s" >&2
+            sleep 5
+        done
+    ) &
+done
+
+exec streamlit run src/streamlit_app.py --server.port=8501 --server.address=0.0.0.0 "$@"
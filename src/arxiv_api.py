@@ -0,0 +1,205 @@
+"""
+Minimal arXiv API client used by the scraper.
+
+Every page of results is one HTTP request to the Atom API. Requests from the
+whole process go through one token-bucket RateLimiter (config.ARXIV_RATE
+requests per second, arXiv asks for at most one every 3 seconds) instead of
+sleeping after every result, and HTTP 429/503 responses are retried with
+backoff, honouring Retry-After. Pages are cached in SQLite (arxiv_cache.py),
+so a repeated query is answered without a request, and get_papers() resolves
+many ids with one id_list request per page, skipping papers cached before.
+
+Example:
+for page in iter_pages('cat:"cs.CL"', max_results=75):
+    for p in page:
+        print(p.entry_id, p.title)
+get_papers(["2406.01234", "2405.01234"])    # {id: Paper}
+"""
+import random, threading, time, urllib.error, urllib.parse, urllib.request
+from datetime import datetime
+from typing import List, NamedTuple
+import config
+import metrics
+import arxiv_cache
+from db import normalise_id
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class Paper(NamedTuple):
+    entry_id:   str            # e.g. http://arxiv.org/abs/2406.01234v1
+    title:      str
+    authors:    List[str]
+    summary:    str            # the abstract
+    published:  str            # ISO timestamp
+    categories: List[str]
+
+    @property
+    def id(self) -> str:
+        """
+        Bare arXiv id without URL or version, as stored in papers.id.
+        """
+        return normalise_id(self.entry_id)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: `rate` requests per second with bursts of `burst`.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate    = rate
+        self.burst   = burst
+        self.tokens  = float(burst)
+        self.updated = time.monotonic()
+        self.lock    = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens  = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            metrics.record("arxiv.rate_limit_wait", wait)
+
+
+_limiter      = None
+_limiter_lock = threading.Lock()
+
+
+def limiter() -> RateLimiter:
+    """
+    The process-wide limiter for arXiv requests (created from config on first use).
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None or _limiter.rate != config.ARXIV_RATE:
+            _limiter = RateLimiter(config.ARXIV_RATE, config.ARXIV_BURST)
+        return _limiter
+
+
+def _retry_after(err, attempt: int) -> float:
+    header = err.headers.get("Retry-After") if getattr(err, "headers", None) else None
+    if header and header.isdigit():
+        return float(header)
+    return min(60.0, 2 ** attempt) + random.random()
+
+
+def fetch(url: str, params: dict, timeout: float = 30.0) -> bytes:
+    """
+    GET `url` through the rate limiter, retrying 429/5xx and network errors
+    with backoff. Raises the last error after config.ARXIV_RETRIES retries.
+    """
+    full = f"{url}?{urllib.parse.urlencode(params)}"
+    for attempt in range(config.ARXIV_RETRIES + 1):
+        limiter().acquire()
+        try:
+            with metrics.span("arxiv.request"), urllib.request.urlopen(full, timeout=timeout) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRY_STATUS or attempt == config.ARXIV_RETRIES:
+                raise
+            with metrics.span("arxiv.backoff", status=e.code):
+                time.sleep(_retry_after(e, attempt))
+        except (urllib.error.URLError, TimeoutError):
+            if attempt == config.ARXIV_RETRIES:
+                raise
+            with metrics.span("arxiv.backoff", status="network"):
+                time.sleep(_retry_after(None, attempt))
+
+
+def _iso(ts: str) -> str:
+    return datetime.fromisoformat(ts.replace("Z", "+00:00")).isoformat()
+
+
+def _paper(entry) -> Paper:
+    return Paper(
+        entry_id   = entry.id,
+        title      = " ".join(entry.title.split()),
+        authors    = [a.name for a in entry.get("authors", [])],
+        summary    = entry.summary.strip(),
+        published  = _iso(entry.published),
+        categories = [t["term"] for t in entry.get("tags", [])],
+    )
+
+
+def fetch_page(query: str = "", start: int = 0, max_results: int = 100,
+               id_list=None, sort_by: str = "submittedDate",
+               sort_order: str = "descending", cache: bool = True):
+    """
+    One page of results. Returns (papers, total_results).
+    With `cache`, the same request within config.ARXIV_CACHE_HOURS is
+    answered from SQLite, and the papers are cached by id for get_papers().
+    """
+    params = {"search_query": query, "start": start, "max_results": max_results,
+              "sortBy": sort_by, "sortOrder": sort_order}
+    if id_list:
+        params["id_list"] = ",".join(id_list)
+    key = arxiv_cache.page_key(params) if cache and config.ARXIV_CACHE_HOURS else None
+    if key:
+        hit = arxiv_cache.lookup(key, config.ARXIV_CACHE_HOURS * 3600)
+        if hit is not None:
+            return [Paper(*p) for p in hit["papers"]], hit["total"]
+
+    import feedparser                   # imported on first request
+    feed  = feedparser.parse(fetch(config.ARXIV_API_URL, params))
+    for e in feed.entries:
+        if "/api/errors" in e.get("id", ""):          # malformed query
+            raise ValueError(f"arXiv API error: {e.get('summary', '').strip()}")
+    total  = int(feed.feed.get("opensearch_totalresults", 0) or 0)
+    papers = [_paper(e) for e in feed.entries]
+    # an empty page before the end is an API hiccup, not an answer worth keeping
+    if key and (papers or start >= total):
+        arxiv_cache.store_many([(key, {"papers": papers, "total": total})]
+                               + [(arxiv_cache.id_key(p.id), p) for p in papers])
+    return papers, total
+
+
+def get_papers(ids, cache: bool = True) -> dict:
+    """
+    Papers for arXiv `ids` (any form normalise_id accepts) as {id: Paper}.
+    Papers cached within config.ARXIV_CACHE_ID_DAYS come from SQLite; the
+    rest are fetched with one id_list request per config.ARXIV_PAGE_SIZE ids.
+    Ids unknown to arXiv are missing from the result.
+    """
+    ids   = list(dict.fromkeys(normalise_id(i) for i in ids))
+    ttl   = config.ARXIV_CACHE_ID_DAYS * 86400 if cache else 0
+    found = {k.split(":", 1)[1]: Paper(*v) for k, v in
+             arxiv_cache.lookup_many([arxiv_cache.id_key(i) for i in ids], ttl).items()}
+    missing = [i for i in ids if i not in found]
+    for i in range(0, len(missing), config.ARXIV_PAGE_SIZE):
+        chunk = missing[i:i + config.ARXIV_PAGE_SIZE]
+        papers, _ = fetch_page(id_list=chunk, max_results=len(chunk), cache=False)
+        found.update((p.id, p) for p in papers)
+        if cache:
+            arxiv_cache.store_many((arxiv_cache.id_key(p.id), p) for p in papers)
+    return found
+
+
+def iter_pages(query: str, max_results: int, page_size: int = None, **kwargs):
+    """
+    Yield lists of Paper, one API request per page, until `max_results`
+    papers or the end of the results.
+    """
+    page_size = min(page_size or config.ARXIV_PAGE_SIZE, max_results)
+    start, empty = 0, 0
+    while start < max_results:
+        papers, total = fetch_page(query, start, min(page_size, max_results - start), **kwargs)
+        if not papers:
+            # the API sometimes returns an empty page mid-way; retry it a few times
+            if start < total and empty < config.ARXIV_RETRIES:
+                empty += 1
+                continue
+            return
+        empty  = 0
+        start += len(papers)
+        yield papers
+        if total and start >= total:
+            return
@@ -0,0 +1,87 @@
+"""
+Persistent cache of arXiv API responses (table arxiv_cache).
+
+Two kinds of entries, stored as JSON:
+
+- "query:<hash>": one page of results for a normalised request (query,
+  paging, sort order), reused for config.ARXIV_CACHE_HOURS, so repeating a
+  search needs no network access.
+- "id:<arXiv id>": the metadata of one paper, reused for
+  config.ARXIV_CACHE_ID_DAYS, so category lookups of papers seen before (in
+  any search) are local.
+
+Hits and misses are counted per kind in metrics (ra_arxiv_cache_hits_total,
+ra_arxiv_cache_misses_total) and by cache_stats().
+
+Example:
+key = page_key({"search_query": 'cat:"cs.CL"', "start": 0, "max_results": 100})
+hit = lookup(key, ttl=3600)              # None on a miss
+store_many([(key, {"papers": [...], "total": 1234})])
+"""
+import hashlib, json
+import config
+from kv_cache import KVCache
+
+_cache = KVCache("arxiv_cache")
+
+
+def page_key(params: dict) -> str:
+    """
+    Key of one API request: whitespace in the query and the order of
+    `id_list` don't matter.
+    """
+    norm = dict(params)
+    norm["search_query"] = " ".join(str(norm.get("search_query", "")).split())
+    if norm.get("id_list"):
+        norm["id_list"] = ",".join(sorted(norm["id_list"].split(",")))
+    blob = json.dumps(norm, sort_keys=True, default=str)
+    return "query:" + hashlib.sha256(blob.encode()).hexdigest()
+
+
+def id_key(paper_id: str) -> str:
+    return f"id:{paper_id}"
+
+
+def lookup_many(keys, ttl: float, conn=None) -> dict:
+    """
+    Cached responses for `keys` stored less than `ttl` seconds ago, as
+    {key: decoded JSON}. All keys should be of one kind.
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+    found = _cache.lookup_many(keys, ttl, keys[0].split(":", 1)[0], conn)
+    return {k: json.loads(r) for k, r in found.items()}
+
+
+def lookup(key: str, ttl: float, conn=None):
+    """
+    Cached response for `key`, or None.
+    """
+    return lookup_many([key], ttl, conn).get(key)
+
+
+def store_many(items, conn=None):
+    """
+    Store (key, JSON-serialisable response) pairs, then drop expired entries.
+    """
+    _cache.store_many(((k, json.dumps(v)) for k, v in items), evict, conn)
+
+
+def evict(conn=None) -> int:
+    """
+    Drop expired entries. Returns the number of entries removed.
+    """
+    return (_cache.expire(config.ARXIV_CACHE_ID_DAYS * 86400, conn=conn)
+            + _cache.expire(config.ARXIV_CACHE_HOURS * 3600, "AND key LIKE 'query:%'", conn))
+
+
+def cache_stats(conn=None) -> dict:
+    """
+    Hits and misses per kind in this process plus size of the persistent cache.
+    """
+    return _cache.stats(conn)
+
+
+def clear(conn=None):
+    _cache.clear(conn)
@@ -0,0 +1,459 @@
+"""
+Inference backends used by summarise.py and ideate.py.
+
+config.LLM_BACKEND picks where generation runs:
+
+- "transformers": in-process Hugging Face pipeline (models.py), CPU or GPU.
+  config.MODEL_NAME is a hub name; a tiny model such as
+  HuggingFaceTB/SmolLM2-135M-Instruct runs on any CPU.
+- "llamacpp": in-process llama.cpp (llama-cpp-python) for CPU-only hosts;
+  config.MODEL_NAME is the path of a .gguf file.
+- "openai": any OpenAI-compatible server (vLLM, llama.cpp server, ...) at
+  config.LLM_URL, e.g. http://127.0.0.1:8000/v1. Requests go over a pool of
+  keep-alive connections, config.LLM_CONCURRENCY at a time; overloaded (429,
+  5xx) and dropped requests are retried config.LLM_RETRIES times with
+  exponential backoff from config.LLM_BACKOFF seconds.
+
+Every backend offers generate(prompts) -> texts, stream(prompt) -> text
+chunks (time to first token is recorded, see models.model_stats) and a
+tokenizer for counting prompt tokens.
+
+Example:
+backend = get_backend()
+backend.generate(["Summarise: ..."], max_new_tokens=150)
+for text in backend.stream("Propose ...", do_sample=False):
+    print(text, end="")
+"""
+import http.client, json, queue, random, re, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import config
+import metrics
+import models
+
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMServerError(RuntimeError):
+    """
+    Non-200 answer from an LLM server; `status` is the HTTP status.
+    """
+    def __init__(self, status: int, detail: str):
+        super().__init__(f"LLM server returned {status}: {detail}")
+        self.status = status
+
+
+def retryable(exc: Exception) -> bool:
+    """
+    Whether a failed request is worth retrying (overload, timeouts, dropped connections).
+    """
+    if isinstance(exc, LLMServerError):
+        return exc.status in RETRY_STATUS
+    return isinstance(exc, (OSError, http.client.HTTPException))
+
+
+class ApproxTokenizer:
+    """
+    Stand-in when the served model's tokenizer is not available: pieces of at
+    most four characters (with their leading whitespace), about as many as a
+    BPE tokenizer produces for English. decode() is exact.
+    """
+    _piece = re.compile(r"\s*\S{1,4}|\s+$")
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [self._piece.findall(t) for t in texts]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(ids)
+
+
+class Backend:
+    """
+    Base class. Subclasses implement generate() and _stream().
+    `concurrent` says whether generate() may be called from several threads
+    at once and gains from it (summarise_rows_async); in-process models can't.
+    """
+    name       = "base"
+    concurrent = False
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def id(self) -> str:
+        """
+        Identifies the model and where it runs, e.g. in LLM cache keys.
+        """
+        return f"{self.name}:{self.model}"
+
+    @property
+    def tokenizer(self):
+        if getattr(self, "_tokenizer", None) is None:
+            try:
+                self._tokenizer = models.get_tokenizer(self.model)
+            except Exception:
+                self._tokenizer = ApproxTokenizer()
+        return self._tokenizer
+
+    def _observe(self, prompts, texts, seconds: float):
+        """
+        Token counts and throughput of a finished generation (see metrics.py).
+        """
+        tok     = self.tokenizer
+        n_in    = sum(len(ids) for ids in tok(list(prompts), add_special_tokens=False)["input_ids"])
+        n_out   = sum(len(ids) for ids in tok(list(texts), add_special_tokens=False)["input_ids"])
+        metrics.inc("llm_prompt_tokens", n_in, backend=self.name)
+        metrics.inc("llm_output_tokens", n_out, backend=self.name)
+        metrics.record("llm.generate", seconds, backend=self.name)
+        if seconds > 0:
+            metrics.observe("llm_tokens_per_second", n_out / seconds, backend=self.name)
+
+    def generate(self, prompts, batch_size: int = None, on_result=None, **gen_kwargs):
+        """
+        Completions for `prompts`, in order, stripped. on_result(i, text) is
+        called as each completion is ready, so callers can keep (e.g. cache)
+        the ones that finished even if another prompt fails and generate raises.
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        t0    = time.perf_counter()
+        texts = self._generate(prompts, batch_size, on_result or (lambda i, text: None), **gen_kwargs)
+        self._observe(prompts, texts, time.perf_counter() - t0)
+        return texts
+
+    def _generate(self, prompts, batch_size, on_result, **gen_kwargs):
+        raise NotImplementedError
+
+    def _stream(self, prompt: str, **gen_kwargs):
+        raise NotImplementedError
+
+    def stream(self, prompt: str, **gen_kwargs):
+        """
+        Yield the completion of `prompt` as it is generated.
+        """
+        t0, ttft, parts = time.perf_counter(), None, []
+        for text in self._stream(prompt, **gen_kwargs):
+            if not text:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - t0
+            parts.append(text)
+            yield text
+        total = time.perf_counter() - t0
+        models.record_generation(self.id, total if ttft is None else ttft, total)
+        self._observe([prompt], ["".join(parts)], total)
+
+
+class TransformersBackend(Backend):
+    name = "transformers"
+
+    @property
+    def id(self) -> str:
+        return self.model           # same cache keys as before backends existed
+
+    def _generate(self, prompts, batch_size, on_result, **gen_kwargs):
+        """
+        Prompts are sorted by token length and run `batch_size` per generate
+        call, so every batch pads (on the left) to roughly the same length
+        instead of to the longest prompt overall.
+        """
+        pipe       = models.get_pipe(self.model)
+        batch_size = batch_size or config.SUMMARY_BATCH_SIZE
+        lengths    = [len(ids) for ids in pipe.tokenizer(prompts)["input_ids"]]
+        order      = sorted(range(len(prompts)), key=lengths.__getitem__)
+
+        texts = [None] * len(prompts)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            outs   = pipe([prompts[i] for i in bucket], batch_size=len(bucket), **gen_kwargs)
+            for i, out in zip(bucket, outs):
+                texts[i] = out[0]['generated_text'].strip()
+                on_result(i, texts[i])
+        return texts
+
+    def stream(self, prompt: str, **gen_kwargs):
+        # stream_generate records time to first token itself
+        t0, parts = time.perf_counter(), []
+        for text in models.stream_generate(prompt, self.model, **gen_kwargs):
+            parts.append(text)
+            yield text
+        self._observe([prompt], ["".join(parts)], time.perf_counter() - t0)
+
+
+class LlamaCppBackend(Backend):
+    name = "llamacpp"
+    _models = OrderedDict()         # gguf path -> Llama, least recently used first
+    _lock   = threading.Lock()      # llama.cpp contexts are not thread safe
+
+    def _llm(self):
+        """
+        Shared model for this .gguf path. As with models.get_pipe, at most
+        config.MODEL_CACHE_SIZE models stay loaded; the least recently used
+        is dropped first (a call still using it keeps it alive until it returns).
+        """
+        with self._lock:
+            if self.model in self._models:
+                self._models.move_to_end(self.model)
+                return self._models[self.model]
+            while self._models and len(self._models) >= max(config.MODEL_CACHE_SIZE, 1):
+                self._models.popitem(last=False)
+            from llama_cpp import Llama
+            llm = self._models[self.model] = Llama(model_path=self.model,
+                                                   n_ctx=config.LLAMACPP_CTX, verbose=False)
+            return llm
+
+    @staticmethod
+    def _params(max_new_tokens=256, do_sample=False, **_):
+        return {"max_tokens": max_new_tokens, "temperature": 0.8 if do_sample else 0.0}
+
+    @property
+    def tokenizer(self):
+        llm = self._llm()
+
+        class Tokenizer:
+            def __call__(self, texts, add_special_tokens=False):
+                return {"input_ids": [llm.tokenize(t.encode(), add_bos=add_special_tokens)
+                                      for t in texts]}
+
+            def decode(self, ids, skip_special_tokens=True):
+                return llm.detokenize(ids).decode(errors="ignore")
+
+        return Tokenizer()
+
+    def _generate(self, prompts, batch_size, on_result, **gen_kwargs):
+        llm = self._llm()
+        out = []
+        for i, prompt in enumerate(prompts):
+            with self._lock:
+                res = llm.create_completion(prompt, **self._params(**gen_kwargs))
+            out.append(res["choices"][0]["text"].strip())
+            on_result(i, out[-1])
+        return out
+
+    def _stream(self, prompt: str, **gen_kwargs):
+        """
+        Completion runs in a producer thread holding the model lock and hands
+        chunks over a queue (as models.stream_generate does), so a consumer that
+        abandons the generator never keeps the lock; the producer stops at the
+        next chunk once the generator is closed.
+        """
+        llm, chunks, stop = self._llm(), queue.Queue(), threading.Event()
+
+        def run():
+            try:
+                with self._lock:
+                    for chunk in llm.create_completion(prompt, stream=True, **self._params(**gen_kwargs)):
+                        if stop.is_set():
+                            break
+                        chunks.put(chunk["choices"][0]["text"])
+            except Exception as e:              # surface in the consuming thread
+                chunks.put(e)
+            finally:
+                chunks.put(None)
+
+        threading.Thread(target=run, daemon=True).start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+
+class OpenAIBackend(Backend):
+    """
+    Client for the /completions endpoint of an OpenAI-compatible server.
+    """
+    name       = "openai"
+    concurrent = True
+
+    def __init__(self, model: str, url: str = None, concurrency: int = None,
+                 timeout: float = None, api_key: str = None):
+        super().__init__(model)
+        url = urlparse(url or config.LLM_URL)
+        self.host, self.port = url.hostname, url.port
+        self.https   = url.scheme == "https"
+        self.path    = url.path.rstrip("/") + "/completions"
+        self.timeout = timeout or config.LLM_TIMEOUT
+        self.api_key = api_key if api_key is not None else config.LLM_API_KEY
+        self.concurrency = concurrency or config.LLM_CONCURRENCY
+        self._pool   = queue.LifoQueue()        # idle keep-alive connections, most recent first
+        self._lock   = threading.Lock()
+        self.stats   = {"requests": 0, "connections": 0}
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}:{self.model}@{self.host}:{self.port}"
+
+    @property
+    def tokenizer(self):
+        # the served name is often no hub model ("fake", a local alias): count
+        # tokens approximately unless config.LLM_TOKENIZER names a tokenizer,
+        # so the client never imports transformers or calls the hub by itself
+        if getattr(self, "_tokenizer", None) is None:
+            self._tokenizer = ApproxTokenizer()
+            if config.LLM_TOKENIZER:
+                try:
+                    self._tokenizer = models.get_tokenizer(config.LLM_TOKENIZER)
+                except Exception:
+                    pass
+        return self._tokenizer
+
+    # ---- connection pool ---------------------------------------------- #
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        with self._lock:
+            self.stats["connections"] += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, conn):
+        # connections are only opened while all idle ones are busy, so the
+        # pool never grows beyond the peak number of concurrent requests
+        self._pool.put(conn)
+
+    def _post(self, body: dict):
+        """
+        Send a request on a pooled connection; returns (conn, response).
+        A stale keep-alive connection is replaced once.
+        """
+        data    = json.dumps(body).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        for attempt in range(2):
+            conn = self._acquire()
+            try:
+                conn.request("POST", self.path, data, headers)
+                resp = conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if attempt or not isinstance(e, (http.client.HTTPException, ConnectionError)):
+                    raise
+                continue
+            with self._lock:
+                self.stats["requests"] += 1
+            if resp.status != 200:
+                try:
+                    detail = resp.read()[:200].decode(errors="replace")
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    raise
+                self._release(conn)
+                raise LLMServerError(resp.status, detail)
+            return conn, resp
+
+    def _retry(self, call):
+        """
+        call(), retrying transient server errors with exponential backoff.
+        """
+        for attempt in range(config.LLM_RETRIES + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == config.LLM_RETRIES or not retryable(e):
+                    raise
+                metrics.inc("llm_retries", backend=self.name)
+                delay = config.LLM_BACKOFF * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay / 2))
+
+    def _body(self, prompt: str, stream: bool, max_new_tokens=256, do_sample=False, **_):
+        return {"model": self.model, "prompt": prompt, "max_tokens": max_new_tokens,
+                "temperature": 0.8 if do_sample else 0.0, "stream": stream}
+
+    # ---- generation ---------------------------------------------------- #
+    def _complete(self, prompt: str, **gen_kwargs) -> str:
+        return self._retry(lambda: self._complete_once(prompt, **gen_kwargs))
+
+    def _complete_once(self, prompt: str, **gen_kwargs) -> str:
+        conn, resp = self._post(self._body(prompt, False, **gen_kwargs))
+        try:
+            out = json.loads(resp.read())
+        except BaseException:
+            # truncated body, HTML error page, ...: the connection is in an
+            # unknown state, so drop it rather than return it to the pool
+            conn.close()
+            raise
+        self._release(conn)
+        return out["choices"][0]["text"].strip()
+
+    def _generate(self, prompts, batch_size, on_result, **gen_kwargs):
+        """
+        Up to self.concurrency requests at once. Every prompt is tried even if
+        one fails (after retries); the first error is raised at the end.
+        """
+        texts, errors = [None] * len(prompts), []
+
+        def one(i):
+            try:
+                texts[i] = self._complete(prompts[i], **gen_kwargs)
+            except Exception as e:
+                errors.append(e)
+                return
+            on_result(i, texts[i])
+
+        if len(prompts) == 1:
+            one(0)
+        else:
+            with ThreadPoolExecutor(min(self.concurrency, len(prompts))) as ex:
+                list(ex.map(one, range(len(prompts))))
+        if errors:
+            raise errors[0]
+        return texts
+
+    def _stream(self, prompt: str, **gen_kwargs):
+        # only the request is retried: once text has been yielded it can't be
+        conn, resp = self._retry(lambda: self._post(self._body(prompt, True, **gen_kwargs)))
+        done = False
+        try:
+            for line in resp:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    done = True
+                    break
+                yield json.loads(data)["choices"][0]["text"]
+            if done:
+                resp.read()                     # drain so the connection can be reused
+        except BaseException:
+            done = False                        # bad chunk or read error: don't reuse
+            raise
+        finally:
+            if done:
+                self._release(conn)
+            else:
+                conn.close()
+
+
+BACKENDS = {"transformers": TransformersBackend, "llamacpp": LlamaCppBackend,
+            "openai": OpenAIBackend}
+_backends = {}
+_lock     = threading.Lock()
+
+
+def get_backend() -> Backend:
+    """
+    Shared backend for the current config.LLM_BACKEND / MODEL_NAME / LLM_URL.
+    """
+    key = (config.LLM_BACKEND, config.MODEL_NAME, config.LLM_URL)
+    with _lock:
+        if key not in _backends:
+            if config.LLM_BACKEND not in BACKENDS:
+                raise ValueError(f"unknown LLM_BACKEND {config.LLM_BACKEND!r}, "
+                                 f"expected one of {sorted(BACKENDS)}")
+            _backends[key] = BACKENDS[config.LLM_BACKEND](config.MODEL_NAME)
+        return _backends[key]
@@ -1,28 +1,59 @@
 """
 Utility script to explore arXiv categories and extract them from papers.
+
+Lookups go through arxiv_api, so they share its rate limiter and the SQLite
+response cache (arxiv_cache.py): papers seen before and repeated category
+searches need no request.
 """
 
-import arxiv
-from typing import List, Dict
+from typing import Dict, Iterable, List, Union
+from arxiv_api import fetch_page, get_papers
+from db import get_conn, normalise_id
+from query_builder import build_query
 
-def get_paper_categories(paper_id: str) -> List[str]:
+def get_paper_categories(paper_ids: Union[str, Iterable[str]]):
     """
-    Get the categories of a specific paper.
+    Get the categories of one or many papers.
+    Ids not in the cache are fetched together, one request per 100 ids.
     
     Args:
-        paper_id: arXiv ID (e.g., "2406.01234")
+        paper_ids: arXiv ID (e.g., "2406.01234") or a list of them
     
     Returns:
-        List of category codes (e.g., ["cs.CL", "cs.AI"])
+        For one ID, its list of category codes (e.g., ["cs.CL", "cs.AI"]);
+        for a list, {id: categories} (empty list for unknown IDs)
     """
-    search = arxiv.Search(id_list=[paper_id])
-    results = list(search.results())
-    
-    if results:
-        paper = results[0]
-        return paper.categories
-    else:
-        return []
+    single = isinstance(paper_ids, str)
+    ids    = [paper_ids] if single else list(paper_ids)
+    papers = get_papers(ids)
+    found  = {}
+    for pid in ids:
+        paper      = papers.get(normalise_id(pid))
+        found[pid] = paper.categories if paper else []
+    return found[paper_ids] if single else found
+
+def backfill_categories(batch: int = 500) -> int:
+    """
+    Record the arXiv categories of stored papers that have none yet (papers
+    scraped before paper_categories existed), `batch` papers per round.
+    Until then the digest's category filter keeps such papers.
+    Returns the number of papers updated.
+    """
+    conn    = get_conn()
+    missing = [pid for pid, in conn.execute(
+        "SELECT id FROM papers p WHERE NOT EXISTS "
+        "(SELECT 1 FROM paper_categories c WHERE c.paper_id = p.id)"
+    )]
+    done = 0
+    for start in range(0, len(missing), batch):
+        found = get_paper_categories(missing[start:start + batch])
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO paper_categories(paper_id, category) VALUES (?, ?)",
+                [(pid, c) for pid, cats in found.items() for c in cats]
+            )
+        done += sum(1 for cats in found.values() if cats)
+    return done
 
 def search_by_category(category: str, max_results: int = 10) -> List[Dict]:
     """
@@ -35,20 +66,16 @@ def search_by_category(category: str, max_results: int = 10) -> List[Dict]:
     Returns:
         List of paper information dictionaries
     """
-    search = arxiv.Search(
-        query=f"cat:{category}",
-        max_results=max_results,
-        sort_by=arxiv.SortCriterion.SubmittedDate
-    )
+    found, _ = fetch_page(build_query(category=category), max_results=max_results)
     
     papers = []
-    for paper in search.results():
+    for paper in found:
         papers.append({
             'id': paper.entry_id,
             'title': paper.title,
-            'authors': [author.name for author in paper.authors],
+            'authors': paper.authors,
             'categories': paper.categories,
-            'published': paper.published.isoformat(),
+            'published': paper.published,
             'summary': paper.summary[:200] + "..." if len(paper.summary) > 200 else paper.summary
         })
     
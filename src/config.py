@@ -1,11 +1,53 @@
 from pathlib import Path
-import pathlib,tempfile
+import os,pathlib,tempfile
 # Root folder for DB
 #PROJ = Path(__file__).parent # For MAC
 PROJ = pathlib.Path(tempfile.gettempdir()) # For Space
 MAX_RESULTS  = 10 #default number of results
+SEARCH_CANDIDATES = 1000 # keyword search ranks the newest this many matches of a query (0: all of them)
+ROW_CACHE_SIZE = 10000 # rendered paper rows kept in memory across Streamlit reruns
+TAG_BATCH_SIZE = 64 # papers per encoder/KeyBERT call when tagging
+ENCODER_NAME = "sentence-transformers/all-MiniLM-L6-v2" # embeddings for tags and semantic search
 
-MODEL_NAME   = "unsloth/llama-3-8b-Instruct-bnb-4bit" #default model
+ARXIV_API_URL   = os.environ.get("RA_ARXIV_API_URL", "https://export.arxiv.org/api/query")
+ARXIV_RATE      = 1 / 3 # API requests per second (arXiv asks for one every 3 s)
+ARXIV_BURST     = 1     # requests allowed back to back before throttling
+ARXIV_PAGE_SIZE = 100   # results per API request
+ARXIV_RETRIES   = 4     # retries on 429/503 and network errors
+ARXIV_CACHE_HOURS   = 12 # identical API queries within this window are answered from SQLite (0: off)
+ARXIV_CACHE_ID_DAYS = 7  # metadata of a paper looked up by id is reused this long
+
+OAI_URL       = os.environ.get("RA_OAI_URL", "https://oaipmh.arxiv.org/oai")
+HARVEST_DAYS  = 7 # how far back the first harvest of a category goes
+
+INGEST_FETCH_THREADS = 4   # concurrent query pagers in ingest.py (requests still share ARXIV_RATE)
+INGEST_TAG_PROCS     = 0   # tagging processes in ingest.py (0: one per available core)
+INGEST_QUEUE_SIZE    = 8   # pages/batches buffered between ingest stages before the producer blocks
+INGEST_WRITE_BATCH   = 500 # papers per writer transaction in ingest.py
+
+LLM_BACKEND  = os.environ.get("RA_LLM_BACKEND", "transformers") # transformers | llamacpp | openai (see backends.py)
+MODEL_NAME   = os.environ.get("RA_MODEL_NAME", "unsloth/llama-3-8b-Instruct-bnb-4bit") # hub name, .gguf path or served model name
+LLM_URL      = os.environ.get("RA_LLM_URL", "http://127.0.0.1:8000/v1") # OpenAI-compatible server for LLM_BACKEND=openai
+LLM_API_KEY  = os.environ.get("RA_LLM_API_KEY", "")
+APP_WORKER   = os.environ.get("RA_APP_WORKER", "auto") # summarise queued jobs in a thread of the app: auto (in-process backends) | 1 | 0
+LLM_TOKENIZER = os.environ.get("RA_LLM_TOKENIZER", "") # hub tokenizer for token counts with LLM_BACKEND=openai (default: approximate)
+LLM_CONCURRENCY = 8  # concurrent requests (and pooled connections) to the LLM server
+LLM_TIMEOUT  = 300   # seconds per LLM server request
+LLM_RETRIES  = 4     # retries of a failed LLM server request (429/5xx, timeouts)
+LLM_BACKOFF  = 1.0   # seconds before the first retry, doubled every time
+LLAMACPP_CTX = 4096  # llama.cpp context window
+MODEL_CACHE_SIZE = 1 # number of models kept loaded at once (LRU eviction)
+SUMMARY_BATCH_SIZE = 8 # abstracts per generate call when summarising
+LLM_CACHE_ENTRIES  = 5000 # cached LLM responses kept (least recently used evicted)
+LLM_CACHE_TTL_DAYS = 30   # cached responses older than this are regenerated
+IDEA_CONTEXT_TOKENS = 1536 # token budget for the paper context of an ideation prompt
+IDEA_MIN_PAPER_TOKENS = 48 # papers are trimmed to no less than this before dropping the least relevant
 
 DB_FILE      = "papers.db" # default database file
-DB_PATH      = PROJ / DB_FILE
\ No newline at end of file
+DB_PATH      = Path(os.environ.get("RA_DB_PATH", PROJ / DB_FILE)) # RA_DB_PATH overrides (benchmarks, workers)
+DB_CACHE_MB  = 32  # SQLite page cache per connection
+DB_MMAP_MB   = 256 # SQLite memory-mapped I/O window
+TEXT_CODEC   = os.environ.get("RA_TEXT_CODEC", "zlib") # abstracts/summaries: zlib | zstd (Python 3.14+ or zstandard) | none
+TEXT_COMPRESS_MIN = 64 # bytes; shorter texts are stored as they are
+
+METRICS_PORT = int(os.environ.get("RA_METRICS_PORT", "0")) # serve Prometheus /metrics on this port (0: off)
@@ -1,20 +1,599 @@
-import sqlite3
-from config import DB_PATH
+"""
+SQLite access for the whole app.
 
-# create table
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute(
+get_conn() hands every thread one long-lived connection per database file
+(WAL journal, synchronous=NORMAL, mmap and a larger page cache), and runs the
+schema migrations once per process. Streamlit sessions, workers and the
+harvester can therefore read while another process writes instead of hitting
+"database is locked". Connections of finished threads are closed when the next
+connection is opened, and all of them at exit; use transaction() for
+read-then-write sequences.
+
+Abstracts and summaries live in paper_text, compressed with pack(), so scans
+of `papers` (lists, counts, date windows) only read the narrow columns. Read
+them with load_text(), or in SQL with LEFT JOIN paper_text t ... unpack(t.summary).
+
+Example:
+conn = get_conn()
+with transaction() as conn:
+    set_summaries(conn, [(text, pid)])
+load_text(conn, [pid], "abstract")    # {pid: "We propose ..."}
+"""
+import atexit, contextlib, re, sqlite3, threading, zlib
+import config
+import metrics
+
+_ID_PREFIX  = re.compile(r"^(?:https?://(?:export\.)?arxiv\.org/(?:abs|pdf)/|arxiv:)", re.I)
+_ID_VERSION = re.compile(r"(?:v\d+)?(?:\.pdf)?$")
+
+
+def normalise_id(paper_id: str) -> str:
+    """
+    Canonical arXiv id used as papers.id: no URL, no "arXiv:" prefix, no version.
+
+    Example:
+    normalise_id("http://arxiv.org/abs/2406.01234v2")  ->  "2406.01234"
+    """
+    if paper_id is None:
+        return None
+    pid = _ID_PREFIX.sub("", paper_id.strip())
+    return _ID_VERSION.sub("", pid, count=1)
+
+
+_zstd_module = None                 # zstd codec, imported on first use
+
+
+def _zstd():
+    global _zstd_module
+    if _zstd_module is None:
+        try:
+            from compression import zstd as _zstd_module      # Python 3.14+
+        except ImportError:
+            import zstandard as _zstd_module                  # pip install zstandard
+    return _zstd_module
+
+
+def pack(text):
+    """
+    Stored form of an abstract or summary for config.TEXT_CODEC: a BLOB of
+    one marker byte (b"z" zlib, b"s" zstd) and the compressed UTF-8, or the
+    text itself when it is short or the codec is "none".
+    """
+    if text is None or config.TEXT_CODEC == "none":
+        return text
+    data = text.encode()
+    if len(data) < config.TEXT_COMPRESS_MIN:
+        return text
+    if config.TEXT_CODEC == "zstd":
+        return b"s" + _zstd().compress(data)
+    return b"z" + zlib.compress(data, 6)
+
+
+def unpack(value):
+    """
+    Text of a pack()ed value, whichever codec wrote it.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if value[:1] == b"s":
+        return _zstd().decompress(value[1:]).decode()
+    return zlib.decompress(value[1:]).decode()
+
+
+# Base schema (user_version 0). Later changes go in MIGRATIONS.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers(
+    id        TEXT PRIMARY KEY,
+    title     TEXT,
+    authors   TEXT,
+    abstract  TEXT,
+    published TEXT,
+    summary   TEXT,
+    tags      TEXT
+);
+CREATE TABLE IF NOT EXISTS summary_jobs(
+    paper_id    TEXT PRIMARY KEY,
+    status      TEXT NOT NULL DEFAULT 'pending',  -- pending|claimed|done|failed
+    priority    INTEGER NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    worker      TEXT,
+    lease_until REAL,
+    error       TEXT,
+    enqueued    REAL,
+    updated     REAL
+);
+CREATE INDEX IF NOT EXISTS summary_jobs_status
+    ON summary_jobs(status, priority, enqueued);
+"""
+
+# Schema changes on top of SCHEMA. Entry i upgrades PRAGMA user_version from
+# i to i+1; append new migrations, never edit old ones.
+MIGRATIONS = [
+    # 1: full-text index over papers (see search.py). External content table, so
+    #    the text lives only in `papers`; triggers keep the index in sync.
+    #    papers has no INTEGER PRIMARY KEY, so rebuild the index after a VACUUM.
+    (
+        "CREATE VIRTUAL TABLE papers_fts USING fts5("
+        "title, abstract, tags, summary, "
+        "content='papers', content_rowid='rowid', tokenize='porter unicode61')",
+        """
+        CREATE TRIGGER papers_fts_ai AFTER INSERT ON papers BEGIN
+            INSERT INTO papers_fts(rowid, title, abstract, tags, summary)
+            VALUES (new.rowid, new.title, new.abstract, new.tags, new.summary);
+        END
+        """,
+        """
+        CREATE TRIGGER papers_fts_ad AFTER DELETE ON papers BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, title, abstract, tags, summary)
+            VALUES ('delete', old.rowid, old.title, old.abstract, old.tags, old.summary);
+        END
+        """,
+        """
+        CREATE TRIGGER papers_fts_au AFTER UPDATE ON papers BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, title, abstract, tags, summary)
+            VALUES ('delete', old.rowid, old.title, old.abstract, old.tags, old.summary);
+            INSERT INTO papers_fts(rowid, title, abstract, tags, summary)
+            VALUES (new.rowid, new.title, new.abstract, new.tags, new.summary);
+        END
+        """,
+        "INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')",
+    ),
+    # 2: row numbers of paper embeddings in the vector file (see vectors.py)
+    (
+        """
+        CREATE TABLE paper_vectors(
+            row      INTEGER PRIMARY KEY,
+            paper_id TEXT NOT NULL UNIQUE
+        )
+        """,
+    ),
+    # 3: ids become bare, unversioned arXiv ids (normalise_id). Older rows used
+    #    the full entry URL, so versions of one paper could be stored twice;
+    #    keep the summarised (else latest) copy of each.
+    (
+        """
+        DELETE FROM papers WHERE rowid NOT IN (
+            SELECT rowid FROM (
+                SELECT rowid, ROW_NUMBER() OVER (
+                    PARTITION BY arxiv_id(id) ORDER BY summary IS NULL, published DESC, id DESC
+                ) AS rn FROM papers
+            ) WHERE rn = 1
+        )
+        """,
+        "UPDATE papers SET id = arxiv_id(id) WHERE id <> arxiv_id(id)",
+        "DELETE FROM paper_vectors WHERE row NOT IN "
+        "(SELECT MIN(row) FROM paper_vectors GROUP BY arxiv_id(paper_id))",
+        "UPDATE paper_vectors SET paper_id = arxiv_id(paper_id) "
+        "WHERE paper_id <> arxiv_id(paper_id)",
+        "DELETE FROM summary_jobs WHERE rowid NOT IN "
+        "(SELECT MIN(rowid) FROM summary_jobs GROUP BY arxiv_id(paper_id))",
+        "UPDATE summary_jobs SET paper_id = arxiv_id(paper_id) "
+        "WHERE paper_id <> arxiv_id(paper_id)",
+    ),
+    # 4: OAI-PMH harvester state (see harvest.py): per-category high-water
+    #    mark and the resumption token of an unfinished run per OAI set
+    (
+        """
+        CREATE TABLE harvest_state(
+            category  TEXT PRIMARY KEY,
+            last_date TEXT NOT NULL,          -- YYYY-MM-DD, next run harvests from here
+            updated   REAL
+        )
+        """,
+        """
+        CREATE TABLE harvest_resume(
+            set_spec   TEXT PRIMARY KEY,
+            token      TEXT,
+            from_date  TEXT NOT NULL,
+            until_date TEXT NOT NULL,         -- high-water mark once the run completes
+            categories TEXT NOT NULL,         -- space separated
+            records    INTEGER NOT NULL DEFAULT 0,
+            updated    REAL
+        )
+        """,
+    ),
+    # 5: normalised tags / authors / categories plus indexes on published.
+    #    papers.tags and papers.authors stay as the display strings; the side
+    #    tables are written by insert_papers. "summary IS NULL ORDER BY
+    #    published" is served by a partial covering index, which the planner
+    #    uses for the query as written (an index on the expression
+    #    (summary IS NULL) is only used for "(summary IS NULL) = 1").
+    (
+        """
+        CREATE TABLE paper_tags(
+            paper_id TEXT NOT NULL,
+            tag      TEXT NOT NULL,           -- lower case
+            PRIMARY KEY (paper_id, tag)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX paper_tags_tag ON paper_tags(tag, paper_id)",
+        """
+        CREATE TABLE paper_authors(
+            paper_id TEXT NOT NULL,
+            position INTEGER NOT NULL,        -- 0 = first author
+            author   TEXT NOT NULL,
+            PRIMARY KEY (paper_id, position)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX paper_authors_author ON paper_authors(author, paper_id)",
+        """
+        CREATE TABLE paper_categories(
+            paper_id TEXT NOT NULL,
+            category TEXT NOT NULL,           -- e.g. cs.CL
+            PRIMARY KEY (paper_id, category)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX paper_categories_category ON paper_categories(category, paper_id)",
+        "CREATE INDEX papers_published ON papers(published)",
+        "CREATE INDEX papers_pending ON papers(published, id) WHERE summary IS NULL",
+        """
+        CREATE TRIGGER papers_side_ad AFTER DELETE ON papers BEGIN
+            DELETE FROM paper_tags       WHERE paper_id = old.id;
+            DELETE FROM paper_authors    WHERE paper_id = old.id;
+            DELETE FROM paper_categories WHERE paper_id = old.id;
+        END
+        """,
+        # backfill from the comma-joined columns
+        """
+        INSERT OR IGNORE INTO paper_tags(paper_id, tag)
+        WITH RECURSIVE split(paper_id, item, rest) AS (
+            SELECT id, NULL, tags || ',' FROM papers WHERE tags IS NOT NULL
+            UNION ALL
+            SELECT paper_id, trim(substr(rest, 1, instr(rest, ',') - 1)),
+                   substr(rest, instr(rest, ',') + 1)
+            FROM split WHERE rest <> ''
+        )
+        SELECT paper_id, lower(item) FROM split WHERE item <> ''
+        """,
+        """
+        INSERT OR IGNORE INTO paper_authors(paper_id, position, author)
+        WITH RECURSIVE split(paper_id, pos, item, rest) AS (
+            SELECT id, -1, NULL, authors || ',' FROM papers WHERE authors IS NOT NULL
+            UNION ALL
+            SELECT paper_id, pos + 1, trim(substr(rest, 1, instr(rest, ',') - 1)),
+                   substr(rest, instr(rest, ',') + 1)
+            FROM split WHERE rest <> ''
+        )
+        SELECT paper_id, pos, item FROM split WHERE item <> ''
+        """,
+    ),
+    # 6: results of deterministic LLM calls (see llm_cache.py)
+    (
+        """
+        CREATE TABLE llm_cache(
+            key       TEXT PRIMARY KEY,       -- sha256 of model, prompt and generation kwargs
+            model     TEXT NOT NULL,
+            response  TEXT NOT NULL,
+            created   REAL NOT NULL,
+            last_used REAL NOT NULL,
+            hits      INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX llm_cache_last_used ON llm_cache(last_used)",
+    ),
+    # 7: arXiv API responses (see arxiv_cache.py)
+    (
+        """
+        CREATE TABLE arxiv_cache(
+            key      TEXT PRIMARY KEY,        -- "query:<sha256 of request>" or "id:<arXiv id>"
+            response TEXT NOT NULL,           -- JSON
+            created  REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX arxiv_cache_created ON arxiv_cache(created)",
+    ),
+    # 8: keyset pagination of the digest by (published, id), see digest.page_rows
+    (
+        "DROP INDEX papers_published",
+        "CREATE INDEX papers_published_id ON papers(published, id)",
+    ),
+    # 9: abstract and summary move to paper_text, compressed with pack(), and
+    #    papers is rebuilt without them, so scans read far fewer pages.
+    #    papers.summarised stands in for "summary IS NOT NULL" (pending index,
+    #    job queue); the paper_text triggers keep it and papers_fts in sync.
+    #    papers_fts now reads its content through the view paper_docs, which
+    #    calls unpack(): use connections from _connect. paper_text rows are
+    #    written after their papers row (insert_papers).
+    (
+        "DROP TRIGGER papers_fts_ai",
+        "DROP TRIGGER papers_fts_ad",
+        "DROP TRIGGER papers_fts_au",
+        "DROP TABLE papers_fts",
+        """
+        CREATE TABLE paper_text(
+            paper_id TEXT PRIMARY KEY,
+            abstract,                         -- TEXT, or BLOB when compressed (pack)
+            summary                           -- NULL until summarised
+        )
+        """,
+        "INSERT INTO paper_text(paper_id, abstract, summary) "
+        "SELECT id, pack(abstract), pack(summary) FROM papers",
         """
-        CREATE TABLE IF NOT EXISTS papers(
-            id        TEXT PRIMARY KEY,
-            title     TEXT,
-            authors   TEXT,
-            abstract  TEXT,
-            published TEXT,
-            summary   TEXT,
-            tags      TEXT
+        CREATE TABLE papers_new(
+            id         TEXT PRIMARY KEY,
+            title      TEXT,
+            authors    TEXT,
+            published  TEXT,
+            tags       TEXT,
+            summarised INTEGER NOT NULL DEFAULT 0
         )
+        """,
+        "INSERT INTO papers_new(rowid, id, title, authors, published, tags, summarised) "
+        "SELECT rowid, id, title, authors, published, tags, summary IS NOT NULL FROM papers",
+        "DROP TABLE papers",
+        "ALTER TABLE papers_new RENAME TO papers",
+        "CREATE INDEX papers_published_id ON papers(published, id)",
+        "CREATE INDEX papers_pending ON papers(published, id) WHERE summarised = 0",
+        """
+        CREATE TRIGGER papers_side_ad AFTER DELETE ON papers BEGIN
+            DELETE FROM paper_tags       WHERE paper_id = old.id;
+            DELETE FROM paper_authors    WHERE paper_id = old.id;
+            DELETE FROM paper_categories WHERE paper_id = old.id;
+        END
+        """,
+        # before, so paper_text_ad still finds the row it unindexes
+        """
+        CREATE TRIGGER papers_text_bd BEFORE DELETE ON papers BEGIN
+            DELETE FROM paper_text WHERE paper_id = old.id;
+        END
+        """,
+        """
+        CREATE VIEW paper_docs AS
+        SELECT p.rowid AS doc_rowid, p.title, unpack(t.abstract) AS abstract,
+               p.tags, unpack(t.summary) AS summary
+        FROM papers p LEFT JOIN paper_text t ON t.paper_id = p.id
+        """,
+        "CREATE VIRTUAL TABLE papers_fts USING fts5("
+        "title, abstract, tags, summary, "
+        "content='paper_docs', content_rowid='doc_rowid', tokenize='porter unicode61')",
+        """
+        CREATE TRIGGER paper_text_ai AFTER INSERT ON paper_text BEGIN
+            INSERT INTO papers_fts(rowid, title, abstract, tags, summary)
+            SELECT p.rowid, p.title, unpack(new.abstract), p.tags, unpack(new.summary)
+            FROM papers p WHERE p.id = new.paper_id;
+            UPDATE papers SET summarised = 1 WHERE id = new.paper_id AND new.summary IS NOT NULL;
+        END
+        """,
+        """
+        CREATE TRIGGER paper_text_ad AFTER DELETE ON paper_text BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, title, abstract, tags, summary)
+            SELECT 'delete', p.rowid, p.title, unpack(old.abstract), p.tags, unpack(old.summary)
+            FROM papers p WHERE p.id = old.paper_id;
+        END
+        """,
         """
-    )
-    return conn
\ No newline at end of file
+        CREATE TRIGGER paper_text_au AFTER UPDATE ON paper_text BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, title, abstract, tags, summary)
+            SELECT 'delete', p.rowid, p.title, unpack(old.abstract), p.tags, unpack(old.summary)
+            FROM papers p WHERE p.id = old.paper_id;
+            INSERT INTO papers_fts(rowid, title, abstract, tags, summary)
+            SELECT p.rowid, p.title, unpack(new.abstract), p.tags, unpack(new.summary)
+            FROM papers p WHERE p.id = new.paper_id;
+            UPDATE papers SET summarised = (new.summary IS NOT NULL) WHERE id = new.paper_id;
+        END
+        """,
+        """
+        CREATE TRIGGER papers_fts_au AFTER UPDATE OF title, tags ON papers BEGIN
+            INSERT INTO papers_fts(papers_fts, rowid, title, abstract, tags, summary)
+            SELECT 'delete', old.rowid, old.title, unpack(t.abstract), old.tags, unpack(t.summary)
+            FROM paper_text t WHERE t.paper_id = old.id;
+            INSERT INTO papers_fts(rowid, title, abstract, tags, summary)
+            SELECT new.rowid, new.title, unpack(t.abstract), new.tags, unpack(t.summary)
+            FROM paper_text t WHERE t.paper_id = new.id;
+        END
+        """,
+        "INSERT INTO papers_fts(papers_fts) VALUES ('rebuild')",
+    ),
+]
+
+
+def _split(text: str):
+    return [x.strip() for x in (text or "").split(",") if x.strip()]
+
+
+def insert_papers(conn, rows, categories=None) -> int:
+    """
+    Bulk insert rows of (id, title, authors, abstract, published, summary,
+    tags), skipping ids that already exist (so concurrent scrapes never hit a
+    primary-key error), together with their compressed text, paper_tags /
+    paper_authors rows and, if given, `categories` (one list per row, e.g.
+    ["cs.CL", "cs.AI"]). One transaction; commits.
+    Returns the number of papers actually inserted.
+    """
+    rows = list(rows)
+    with conn:
+        cur = conn.executemany(
+            "INSERT OR IGNORE INTO papers(id, title, authors, published, tags) VALUES (?,?,?,?,?)",
+            [(r[0], r[1], r[2], r[4], r[6]) for r in rows]
+        )
+        added = cur.rowcount
+        conn.executemany(
+            "INSERT OR IGNORE INTO paper_text(paper_id, abstract, summary) VALUES (?,?,?)",
+            [(r[0], pack(r[3]), pack(r[5])) for r in rows]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO paper_tags(paper_id, tag) VALUES (?, ?)",
+            [(r[0], tag.lower()) for r in rows for tag in _split(r[6])]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO paper_authors(paper_id, position, author) VALUES (?, ?, ?)",
+            [(r[0], pos, a) for r in rows for pos, a in enumerate(_split(r[2]))]
+        )
+        if categories:
+            conn.executemany(
+                "INSERT OR IGNORE INTO paper_categories(paper_id, category) VALUES (?, ?)",
+                [(r[0], c) for r, cats in zip(rows, categories) for c in cats]
+            )
+    return added
+
+
+def set_summaries(conn, results):
+    """
+    Store (summary, paper_id) pairs, compressed; a None summary marks the
+    paper as pending again. Runs in the caller's transaction.
+    """
+    conn.executemany("UPDATE paper_text SET summary=? WHERE paper_id=?",
+                     [(pack(s), pid) for s, pid in results])
+
+
+def load_text(conn, ids, field: str = "summary") -> dict:
+    """
+    {id: text} of `field` ("abstract" or "summary") for `ids`, for the rows
+    actually shown or sent to the LLM.
+    """
+    if field not in ("abstract", "summary"):
+        raise ValueError(f"unknown text field {field!r}")
+    ids = list(ids)
+    if not ids:
+        return {}
+    return {pid: unpack(v) for pid, v in conn.execute(
+        f"SELECT paper_id, {field} FROM paper_text "
+        f"WHERE paper_id IN ({','.join('?' * len(ids))})", ids
+    )}
+
+
+def existing_ids(conn, ids) -> set:
+    """
+    The subset of `ids` already stored, in one query.
+    """
+    ids = list(ids)
+    if not ids:
+        return set()
+    return {pid for pid, in conn.execute(
+        f"SELECT id FROM papers WHERE id IN ({','.join('?' * len(ids))})", ids
+    )}
+
+
+def migrate(conn):
+    """
+    Bring the schema up to date. Each pending migration runs in its own
+    write transaction, so concurrent processes apply it exactly once.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return                              # up to date: no write lock needed
+    conn.executescript(SCHEMA)
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(MIGRATIONS):
+            conn.rollback()
+            return
+        try:
+            for stmt in MIGRATIONS[version]:
+                conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+_local    = threading.local()       # .conns: {db path: connection} of this thread
+_open     = {}                       # id(conn) -> (owning thread, conn), for cleanup
+_migrated = set()                    # db paths migrated by this process
+_lock     = threading.Lock()
+
+
+class _Connection(sqlite3.Connection):
+    """
+    Times every execute/executemany as metrics span "db.query" (labelled by
+    statement type). Rows fetched later from the cursor are not included.
+    """
+    def execute(self, sql, *args):
+        with metrics.span("db.query", op=sql.lstrip()[:6].upper().rstrip()):
+            return super().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        with metrics.span("db.query", op=sql.lstrip()[:6].upper().rstrip()):
+            return super().executemany(sql, *args)
+
+
+def _connect(path):
+    # wait for other writers (e.g. worker processes) instead of failing at once;
+    # check_same_thread is off only so that close_all() can close it from elsewhere
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, factory=_Connection)
+    conn.create_function("arxiv_id", 1, normalise_id, deterministic=True)
+    conn.create_function("pack", 1, pack, deterministic=True)
+    conn.create_function("unpack", 1, unpack, deterministic=True)
+    conn.execute("PRAGMA synchronous = NORMAL")          # safe with WAL
+    conn.execute(f"PRAGMA cache_size = -{config.DB_CACHE_MB * 1024}")
+    conn.execute(f"PRAGMA mmap_size = {config.DB_MMAP_MB * 2**20}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    with _lock:
+        if path not in _migrated:
+            conn.execute("PRAGMA journal_mode = WAL")    # persistent, stored in the file
+            migrate(conn)
+            _migrated.add(path)
+    return conn
+
+
+def _reap():
+    """
+    Close connections whose thread has finished (e.g. old Streamlit reruns).
+    """
+    with _lock:
+        dead = [k for k, (t, _) in _open.items() if not t.is_alive()]
+        conns = [_open.pop(k)[1] for k in dead]
+    for conn in conns:
+        conn.close()
+
+
+def get_conn():
+    """
+    This thread's connection to config.DB_PATH, opened (and the schema
+    migrated) on first use. Don't close it; see close_conn().
+    """
+    path  = str(config.DB_PATH)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+
+    _reap()
+    conn = conns[path] = _connect(path)
+    with _lock:
+        _open[id(conn)] = (threading.current_thread(), conn)
+    return conn
+
+
+def close_conn():
+    """
+    Close this thread's connections (the next get_conn() opens a new one).
+    """
+    for conn in getattr(_local, "conns", {}).values():
+        with _lock:
+            _open.pop(id(conn), None)
+        conn.close()
+    _local.conns = {}
+
+
+@atexit.register
+def close_all():
+    """
+    Close every connection opened by this process.
+    """
+    with _lock:
+        conns = [c for _, c in _open.values()]
+        _open.clear()
+    for conn in conns:
+        conn.close()
+
+
+@contextlib.contextmanager
+def transaction(conn=None):
+    """
+    Write transaction that takes the write lock up front (BEGIN IMMEDIATE), so
+    a read-then-write sequence waits for other writers instead of failing.
+    """
+    conn = conn or get_conn()
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
@@ -1,34 +1,149 @@
 import datetime, html
-from db import get_conn
+from db import get_conn, load_text
+from search import match_filter
 
 """
-Build an HTML digest of the latest papers on a specific topic   .
+Build an HTML digest of the latest papers, optionally restricted to arXiv
+categories, tags, an author and/or a keyword. Categories, tags and authors are
+looked up in the indexed side tables (paper_categories, paper_tags,
+paper_authors). Papers stored before categories were recorded have none and
+are kept by a category filter rather than dropped (see
+category_explorer.backfill_categories). Rows are streamed from the cursor and the HTML
+is yielded chunk by chunk, so memory stays flat however many papers match.
+
+Papers are ordered newest first by (published, id). Pages are selected with a
+keyset cursor, the (published, id) of the last paper shown, so page 200 costs
+the same index range scan as page 1 instead of skipping 10k rows as OFFSET does.
 
 Example:
-build_html(lookback_hours=48)
+html = "".join(build_html(lookback_hours=48))
+write_html("digest.html", lookback_hours=24 * 30, categories=["cs.CL"])
+write_html("hinton.html", lookback_hours=24 * 365, author="Geoffrey Hinton", tags=["capsule networks"])
+rows, cursor = page_rows(lookback_hours=24 * 7, limit=50)
+rows, cursor = page_rows(lookback_hours=24 * 7, limit=50, after=cursor)   # next page
 """
 
-def build_html():
-    today = datetime.date.today().isoformat()
-    
+HEADER = [
+    "<!DOCTYPE html>",
+    "<meta charset='utf-8'>",
+    "<h1>Literature Digest — {today}</h1>",
+    "<style>body{{font-family:Arial,Helvetica,sans-serif;max-width:760px;margin:0 auto}}</style>",
+]
+
+
+def _header() -> str:
+    return "\n".join(HEADER).format(today=datetime.date.today().isoformat()) + "\n"
+
+
+def _query(lookback_hours, categories, keyword, after=None,
+           fields="p.title, p.authors, unpack(t.summary), p.published", tags=None, author=None):
+    since = (datetime.datetime.now(datetime.timezone.utc)
+             - datetime.timedelta(hours=lookback_hours)).strftime("%Y-%m-%dT%H:%M:%S")
+    sql  = (f"SELECT {fields} FROM papers p LEFT JOIN paper_text t ON t.paper_id = p.id "
+            "WHERE p.published >= ?")
+    args = [since]
+    if after is not None:
+        sql  += " AND (p.published, p.id) < (?, ?)"
+        args += list(after)
+    if categories:
+        sql += (" AND (p.id IN (SELECT paper_id FROM paper_categories "
+                f"WHERE category IN ({','.join('?' * len(categories))})) "
+                "OR NOT EXISTS (SELECT 1 FROM paper_categories c WHERE c.paper_id = p.id))")
+        args += list(categories)
+    if tags:
+        sql += (" AND p.id IN (SELECT paper_id FROM paper_tags "
+                f"WHERE tag IN ({','.join('?' * len(tags))}))")
+        args += [tag.strip().lower() for tag in tags]
+    if author:
+        sql += " AND p.id IN (SELECT paper_id FROM paper_authors WHERE author = ?)"
+        args.append(author.strip())
+    if keyword:
+        match = match_filter(keyword, "p")
+        if match is None:
+            return None, None
+        sql += f" AND {match[0]}"
+        args.append(match[1])
+    return sql + " ORDER BY p.published DESC, p.id DESC", args
+
+
+def page_rows(lookback_hours: float = 48, categories=None, keyword: str = None,
+              limit: int = 50, after=None, tags=None, author: str = None):
+    """
+    One page of the digest as rows of (id, title, authors, summary, published),
+    for helpers.render_rows. `after` is the cursor returned for the previous
+    page. Returns (rows, cursor), the cursor being None on the last page.
+    Summaries are loaded for the page's rows only.
+    """
+    sql, args = _query(lookback_hours, categories, keyword, after,
+                       fields="p.id, p.title, p.authors, p.published", tags=tags, author=author)
+    if sql is None:
+        return [], None
     conn = get_conn()
-    rows = conn.execute(
-        "SELECT title, authors, summary, published "
-        "FROM papers WHERE published >= ? "
-        "ORDER BY published DESC"
-    )
-
-    out = [
-        "<!DOCTYPE html>",
-        "<meta charset='utf-8'>",
-        f"<h1>Literature Digest — {today}</h1>",
-        "<style>body{font-family:Arial,Helvetica,sans-serif;max-width:760px;margin:0 auto}</style>"
-    ]
-    for title, authors, summary, pub in rows:
-        out += [
-            f"<h2>{html.escape(title)}</h2>",
-            f"<p><b>Authors:</b> {html.escape(authors)}<br><i>{pub[:10]}</i></p>",
-            f"<pre style='white-space:pre-wrap'>{html.escape(summary)}</pre>",
-            "<hr>"
-        ]
-    return "\n".join(out)
\ No newline at end of file
+    rows = conn.execute(sql + " LIMIT ?", args + [limit]).fetchall()
+    cursor = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+    summaries = load_text(conn, [r[0] for r in rows])
+    return [(pid, title, authors, summaries.get(pid), pub) for pid, title, authors, pub in rows], cursor
+
+
+def build_html(lookback_hours: float = 48, categories=None, keyword: str = None,
+               limit: int = None, offset: int = 0, full_page: bool = True, after=None,
+               tags=None, author: str = None):
+    """
+    Yield the digest of papers published in the last `lookback_hours`, newest
+    first, as HTML chunks (one per paper). `limit` with a page_rows cursor
+    `after` (or `offset`) selects a page; `full_page=False` leaves out the
+    document header. `tags` keeps papers with any of those tags, `author`
+    papers with that author (full name as stored).
+    """
+    if full_page:
+        yield _header()
+    yield from _papers_html(lookback_hours, categories, keyword, limit, offset, after, tags, author)
+
+
+def _papers_html(lookback_hours, categories, keyword, limit, offset, after, tags, author):
+    # one HTML chunk per paper
+    sql, args = _query(lookback_hours, categories, keyword, after, tags=tags, author=author)
+    if sql is None:
+        return
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        args += [limit, offset]
+
+    for title, authors, summary, pub in get_conn().execute(sql, args):
+        yield "\n".join([
+            f"<h2>{html.escape(title or '')}</h2>",
+            f"<p><b>Authors:</b> {html.escape(authors or '')}<br><i>{(pub or '')[:10]}</i></p>",
+            f"<pre style='white-space:pre-wrap'>{html.escape(summary or '')}</pre>",
+            "<hr>",
+        ]) + "\n"
+
+
+def count_papers(lookback_hours: float = 48, categories=None, keyword: str = None,
+                 tags=None, author: str = None) -> int:
+    """
+    Number of papers build_html would include (for paging).
+    """
+    sql, args = _query(lookback_hours, categories, keyword, fields="COUNT(*)",
+                       tags=tags, author=author)
+    if sql is None:
+        return 0
+    sql = sql.rsplit(" ORDER BY", 1)[0]
+    return get_conn().execute(sql, args).fetchone()[0]
+
+
+def write_html(path, lookback_hours: float = 48, categories=None, keyword: str = None,
+               limit: int = None, offset: int = 0, full_page: bool = True, after=None,
+               tags=None, author: str = None) -> int:
+    """
+    Stream the digest straight to `path`; takes build_html's arguments.
+    Returns the number of papers written.
+    """
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        if full_page:
+            f.write(_header())
+        for chunk in _papers_html(lookback_hours, categories, keyword, limit, offset,
+                                  after, tags, author):
+            f.write(chunk)
+            n += 1
+    return n
@@ -0,0 +1,201 @@
+"""
+Headless, incremental harvester for new arXiv submissions via OAI-PMH.
+
+Categories are harvested per OAI set (cs.CL and cs.LG both live in set "cs",
+so the set is downloaded once) with `ListRecords` from each category's
+high-water mark (table harvest_state). Every page of up to ~1000 records is
+stored in the same transaction as its resumption token (harvest_resume), and
+the last page with the new high-water mark, so a crashed run continues where
+it stopped instead of downloading again. Requests
+share the arXiv rate limiter and backoff of arxiv_api.fetch (OAI flow control
+answers 503 + Retry-After).
+
+Example:
+python src/harvest.py cs.CL cs.LG
+python src/harvest.py --all --since 2024-06-01
+python src/harvest.py cs.CL --tag        # also tag and embed new papers
+"""
+import argparse, datetime, time
+import xml.etree.ElementTree as ET
+import config
+from arxiv_api import Paper, fetch
+from db import get_conn, insert_papers
+
+OAI   = "{http://www.openarchives.org/OAI/2.0/}"
+ARXIV = "{http://arxiv.org/OAI/arXiv/}"
+
+# top-level OAI sets; every other archive (hep-th, quant-ph, ...) is physics:<archive>
+TOP_SETS = {"cs", "econ", "eess", "math", "physics", "q-bio", "q-fin", "stat"}
+
+
+def oai_set(category: str) -> str:
+    """
+    OAI set containing `category`.
+
+    Example:
+    oai_set("cs.CL") -> "cs";  oai_set("hep-th") -> "physics:hep-th"
+    """
+    archive = category.split(".")[0]
+    return archive if archive in TOP_SETS else f"physics:{archive}"
+
+
+def _text(el, path):
+    node = el.find(path)
+    return " ".join(node.text.split()) if node is not None and node.text else ""
+
+
+def parse_page(body: bytes):
+    """
+    Parse one ListRecords response.
+    Returns (papers, resumption_token, error_code, response_date).
+    """
+    root  = ET.fromstring(body)
+    error = root.find(f"{OAI}error")
+    date  = _text(root, f"{OAI}responseDate")[:10]
+    if error is not None:
+        return [], None, error.get("code"), date
+
+    papers = []
+    for rec in root.iter(f"{OAI}record"):
+        if rec.find(f"{OAI}header").get("status") == "deleted":
+            continue
+        meta = rec.find(f"{OAI}metadata/{ARXIV}arXiv")
+        if meta is None:
+            continue
+        authors = [" ".join(filter(None, (_text(a, f"{ARXIV}forenames"), _text(a, f"{ARXIV}keyname"))))
+                   for a in meta.iter(f"{ARXIV}author")]
+        papers.append(Paper(
+            entry_id   = _text(meta, f"{ARXIV}id"),
+            title      = _text(meta, f"{ARXIV}title"),
+            authors    = authors,
+            summary    = _text(meta, f"{ARXIV}abstract"),
+            published  = f"{_text(meta, f'{ARXIV}created')}T00:00:00+00:00",
+            categories = _text(meta, f"{ARXIV}categories").split(),
+        ))
+
+    tok   = root.find(f"{OAI}ListRecords/{OAI}resumptionToken")
+    token = tok.text.strip() if tok is not None and tok.text and tok.text.strip() else None
+    return papers, token, None, date
+
+
+def _rows(papers, tag: bool):
+    tags, embs = [None] * len(papers), None
+    if tag and papers:
+        from models import get_encoder
+        from scrape import make_tags_batch
+        from vectors import doc_text
+        docs = [doc_text(p.title, p.summary) for p in papers]
+        embs = get_encoder().encode(docs, batch_size=config.TAG_BATCH_SIZE, normalize_embeddings=True)
+        tags = make_tags_batch(docs, embs)
+    rows = [(p.id, p.title, ", ".join(p.authors), p.summary, p.published, None, t)
+            for p, t in zip(papers, tags)]
+    return rows, embs
+
+
+def harvest_set(set_spec: str, categories, from_date: str, tag: bool = False,
+                max_pages: int = None, conn=None) -> int:
+    """
+    Harvest one OAI set from `from_date`, keeping records in `categories`
+    (an unfinished run of the same set is resumed from its token instead).
+    `max_pages` stops early, leaving the run resumable.
+    Returns the number of new papers stored.
+    """
+    conn  = conn or get_conn()
+    state = conn.execute(
+        "SELECT token, from_date, until_date, categories FROM harvest_resume WHERE set_spec=?",
+        (set_spec,)
+    ).fetchone()
+    if state and state[0]:
+        token, from_date, until_date, cats = state
+        categories = set(cats.split()) | set(categories)
+    else:
+        token, until_date = None, None
+    categories = set(categories)
+
+    added, pages = 0, 0
+    while max_pages is None or pages < max_pages:
+        if token:
+            params = {"verb": "ListRecords", "resumptionToken": token}
+        else:
+            params = {"verb": "ListRecords", "metadataPrefix": "arXiv",
+                      "set": set_spec, "from": from_date}
+        papers, next_token, error, date = parse_page(fetch(config.OAI_URL, params, timeout=120))
+        pages += 1
+        if error == "badResumptionToken" and token:
+            token = None                     # expired: start over from from_date
+            continue
+        if error and error != "noRecordsMatch":
+            raise RuntimeError(f"OAI-PMH error {error} for set {set_spec}")
+        until_date = until_date or date
+
+        wanted = [p for p in papers if categories.intersection(p.categories)]
+        rows, embs = _rows(wanted, tag)
+        # the token, or on the last page the high-water mark, is written in
+        # the same transaction insert_papers commits
+        if next_token:
+            conn.execute(
+                "INSERT INTO harvest_resume(set_spec, token, from_date, until_date, categories, records, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(set_spec) DO UPDATE SET "
+                "token=excluded.token, records=records + excluded.records, updated=excluded.updated",
+                (set_spec, next_token, from_date, until_date, " ".join(sorted(categories)),
+                 len(papers), time.time())
+            )
+        else:
+            conn.executemany(
+                "INSERT INTO harvest_state(category, last_date, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(category) DO UPDATE SET last_date=excluded.last_date, "
+                "updated=excluded.updated",
+                [(c, until_date, time.time()) for c in categories]
+            )
+            conn.execute("DELETE FROM harvest_resume WHERE set_spec=?", (set_spec,))
+        added += insert_papers(conn, rows, [p.categories for p in wanted])
+        if tag and rows:
+            from vectors import add_vectors
+            add_vectors(conn, [r[0] for r in rows], embs)
+
+        token = next_token
+        if not token:
+            break
+    return added
+
+
+def harvest(categories, since: str = None, tag: bool = False, max_pages: int = None) -> dict:
+    """
+    Incrementally harvest `categories`. Each category starts at its high-water
+    mark, else at `since`, else config.HARVEST_DAYS ago.
+    Returns {set_spec: papers added}.
+    """
+    conn    = get_conn()
+    default = since or (datetime.date.today() - datetime.timedelta(days=config.HARVEST_DAYS)).isoformat()
+    marks   = dict(conn.execute("SELECT category, last_date FROM harvest_state"))
+
+    by_set = {}
+    for cat in categories:
+        by_set.setdefault(oai_set(cat), []).append(cat)
+
+    report = {}
+    for set_spec, cats in by_set.items():
+        from_date = min(marks.get(c, default) for c in cats)
+        t0 = time.perf_counter()
+        report[set_spec] = harvest_set(set_spec, cats, from_date, tag, max_pages, conn)
+        print(f"[harvest] {set_spec}: {report[set_spec]} new papers from {from_date} "
+              f"in {time.perf_counter() - t0:.1f}s")
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Harvest new arXiv papers via OAI-PMH.")
+    ap.add_argument("categories", nargs="*", help="e.g. cs.CL cs.LG")
+    ap.add_argument("--all", action="store_true", help="every category in get_common_categories()")
+    ap.add_argument("--since", help="YYYY-MM-DD start for categories never harvested")
+    ap.add_argument("--tag", action="store_true", help="tag and embed new papers (slower)")
+    ap.add_argument("--max-pages", type=int, help="stop after N pages per set (resumable)")
+    args = ap.parse_args()
+
+    cats = list(args.categories)
+    if args.all:
+        from category_explorer import get_common_categories
+        cats += list(get_common_categories())
+    if not cats:
+        ap.error("give categories or --all")
+    harvest(cats, args.since, args.tag, args.max_pages)
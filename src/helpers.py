@@ -1,42 +1,81 @@
-import html, sqlite3
+import hashlib, html, sqlite3, threading
+from collections import OrderedDict
+import config
+from search import search_papers
 from db import get_conn
 
+_fragments      = OrderedDict()   # (id, summary hash) -> HTML, least recently used first
+_fragments_lock = threading.Lock()
+
+def _fragment(t, a, txt, pub):
+    #Handle None values by converting to empty strings
+    title = html.escape(t) if t is not None else ""
+    authors = html.escape(a) if a is not None else ""
+    summary = html.escape(txt) if txt is not None else ""
+    published = pub[:10] if pub is not None else ""
+
+    return "\n".join([
+        f"<h3>{title}</h3>",
+        f"<p><b>Authors:</b> {authors} <br><i>{published}</i></p>",
+        f"<pre style='white-space:pre-wrap'>{summary}</pre>",
+        "<hr>"
+    ])
+
+def render_row(paper_id, title, authors, summary, published):
+    """
+    HTML of one paper, memoised by id and a hash of its summary (so a new
+    summary renders afresh). Streamlit reruns the script on every
+    interaction; a page of rows seen before is then just joined again.
+    The config.ROW_CACHE_SIZE most recently used fragments are kept.
+    """
+    key = (paper_id, hashlib.blake2b((summary or "").encode(), digest_size=8).digest())
+    with _fragments_lock:
+        frag = _fragments.get(key)
+        if frag is not None:
+            _fragments.move_to_end(key)
+            return frag
+    frag = _fragment(title, authors, summary, published)
+    with _fragments_lock:
+        _fragments[key] = frag
+        while len(_fragments) > config.ROW_CACHE_SIZE:
+            _fragments.popitem(last=False)
+    return frag
+
 def render_rows(rows):
     """
-    Render rows as HTML.
+    Render rows of (title, authors, summary, published) as HTML. Rows with the
+    paper id first, e.g. from digest.page_rows, go through render_row.
 
     Example:
     render_rows(rows_by_tag("diffusion models"))
+    render_rows(page_rows(lookback_hours=24 * 7)[0])
     """
-    blocks = []
-    for t, a, txt, pub in rows:
-        #Handle None values by converting to empty strings
-        title = html.escape(t) if t is not None else ""
-        authors = html.escape(a) if a is not None else ""
-        summary = html.escape(txt) if txt is not None else ""
-        published = pub[:10] if pub is not None else ""
-        
-        blocks += [
-            f"<h3>{title}</h3>",
-            f"<p><b>Authors:</b> {authors} <br><i>{published}</i></p>",
-            f"<pre style='white-space:pre-wrap'>{summary}</pre>",
-            "<hr>"
-        ]
+    blocks = [render_row(*r) if len(r) == 5 else _fragment(*r) for r in rows]
     return "\n".join(blocks) or "<p>No matching papers found.</p>"
 
 def rows_by_tag(keyword: str, limit: int = 25):
     """
-    Get rows in databaseby tag.
+    Get the rows in database best matching `keyword` (full-text search over
+    title, abstract, tags and summary, ranked by bm25; see search.py).
 
     Example:
     rows_by_tag("diffusion models")
     """
-    conn = get_conn()
-    q = f"%{keyword.lower()}%"
-    return conn.execute(
-        "SELECT title, authors, summary, published FROM papers "
-        "WHERE LOWER(tags) LIKE ? ORDER BY published DESC LIMIT ?", (q, limit)
-    ).fetchall()
+    return search_papers(keyword, limit)
 
+def rows_by_ids(ids, conn=None):
+    """
+    Get rows in database for paper `ids`, in the order given (e.g. by relevance).
 
-    
\ No newline at end of file
+    Example:
+    rows_by_ids(semantic_ids("protein folding"))
+    """
+    if not ids:
+        return []
+    conn = conn or get_conn()
+    found = {pid: row for pid, *row in conn.execute(
+        "SELECT p.id, p.title, p.authors, unpack(t.summary), p.published FROM papers p "
+        "LEFT JOIN paper_text t ON t.paper_id = p.id "
+        f"WHERE p.id IN ({','.join('?' * len(ids))})", list(ids)
+    )}
+    return [tuple(found[pid]) for pid in ids if pid in found]
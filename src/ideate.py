@@ -1,9 +1,11 @@
 import textwrap
-from summarise import load_pipe
-from scrape     import scrape
-from db         import get_conn
-from typing import Optional,List
-from helpers   import rows_by_tag
+import config
+from db         import get_conn, normalise_id
+from typing import Optional,List,Iterator
+from backends   import get_backend
+from llm_cache  import cached_generate, cached_stream
+from search    import search_papers
+from vectors   import semantic_ids
 
 IDEA_PROMPT = (
    " You are a senior ML researcher. CONTEXT provides a list of papers. From this list of papers, propose THREE new research projects."
@@ -15,31 +17,117 @@ IDEA_PROMPT = (
 )
 
 # ---------------------------------------------------------------------- #
-def ideate_from_topic(topic: str, k: int = 8) -> Optional[str]:
-    rows = rows_by_tag(topic, k)
-    if not rows:
+def build_context(rows, budget: int = None, tokenizer=None) -> Optional[str]:
+    """
+    Pack (title, summary, abstract) rows, most relevant first, into at most
+    `budget` tokens (default config.IDEA_CONTEXT_TOKENS) of "- title: text"
+    lines. The text is the summary, or the abstract where there is none. Every
+    paper gets an equal share of the budget, shares unused by short papers go
+    to longer ones, and text over its share is trimmed; only when a share
+    would fall below config.IDEA_MIN_PAPER_TOKENS are the least relevant
+    papers left out. Keeps prefill time per ideation predictable.
+    """
+    budget    = budget or config.IDEA_CONTEXT_TOKENS
+    tokenizer = tokenizer or get_backend().tokenizer
+    lines     = [(f"- {title}: ", (summary or abstract or "").strip())
+                 for title, summary, abstract in rows]
+    if not lines:
         return None
+    lines = lines[:max(budget // config.IDEA_MIN_PAPER_TOKENS, 1)]
 
-    ctx  = "\n".join(f"- {t}: {s}" for t, _, s, _ in rows)
-    llm  = load_pipe()
-    return llm(IDEA_PROMPT.format(context=ctx),
-               do_sample=False)[0]['generated_text'].strip()
+    ids  = tokenizer([h + t for h, t in lines], add_special_tokens=False)["input_ids"]
+    head = [len(x) for x in tokenizer([h for h, _ in lines], add_special_tokens=False)["input_ids"]]
+    # water-filling: shortest first, each takes at most an equal share of what is left
+    share, left = [0] * len(lines), budget
+    for n, i in enumerate(sorted(range(len(lines)), key=lambda i: len(ids[i]))):
+        share[i] = min(len(ids[i]), left // (len(lines) - n))
+        left    -= share[i]
 
-# ------------------------------------------------------------------ #
-def ideate_from_ids(ids: List[str]) -> Optional[str]:
-    from db import get_conn
-    conn = get_conn()
-    ctx = []
-    for pid in ids:
-        row = conn.execute(
-            "SELECT title, summary FROM papers WHERE id=?", (pid,)
-        ).fetchone()
-        if row:
-            ctx.append(f"- {row[0]}: {row[1]}")
+    out = []
+    for (title, text), toks, n, n_title in zip(lines, ids, share, head):
+        if n >= len(toks):
+            out.append(title + text)
+        elif n <= n_title:                  # share smaller than the title: keep just the title
+            out.append(title + "...")
+        else:
+            out.append(tokenizer.decode(toks[:n], skip_special_tokens=True).rstrip() + " ...")
+    return "\n".join(out)
+
+
+def _rows_by_ids(ids: List[str]):
+    if not ids:
+        return []
+    found = {pid: row for pid, *row in get_conn().execute(
+        "SELECT p.id, p.title, unpack(t.summary), unpack(t.abstract) FROM papers p "
+        "LEFT JOIN paper_text t ON t.paper_id = p.id "
+        f"WHERE p.id IN ({','.join('?' * len(ids))})", ids
+    )}
+    return [tuple(found[pid]) for pid in ids if pid in found]
+
+
+def _topic_context(topic: str, k: int, semantic: bool) -> Optional[str]:
+    if semantic:
+        rows = _rows_by_ids(semantic_ids(topic, k))
+    else:
+        rows = search_papers(topic, k, fields="p.title, unpack(t.summary), unpack(t.abstract)")
+    return build_context(rows)
+
+
+def _ids_context(ids: List[str]) -> Optional[str]:
+    ids = list(dict.fromkeys(normalise_id(pid) for pid in ids if pid))
+    return build_context(_rows_by_ids(ids))
+
+
+def _generate(ctx: str) -> str:
+    # deterministic, so repeated ideation over the same papers is a cache lookup
+    backend = get_backend()
+    return cached_generate(IDEA_PROMPT.format(context=ctx),
+                           lambda p, **kw: backend.generate([p], **kw)[0],
+                           model_name=backend.id, do_sample=False)
 
+
+def _stream(ctx: Optional[str]) -> Optional[Iterator[str]]:
     if not ctx:
         return None
+    backend = get_backend()
+    return cached_stream(IDEA_PROMPT.format(context=ctx), backend.stream,
+                         model_name=backend.id, do_sample=False)
+
+
+def ideate_from_topic(topic: str, k: int = 8, semantic: bool = False) -> Optional[str]:
+    """
+    Propose projects from the `k` papers best matching `topic`, by keyword
+    (full-text search) or, with `semantic`, by embedding similarity.
+    """
+    ctx = _topic_context(topic, k, semantic)
+    return _generate(ctx) if ctx else None
+
+# ------------------------------------------------------------------ #
+def ideate_from_ids(ids: List[str]) -> Optional[str]:
+    """
+    Propose projects from the given papers. Ids may be bare ("2406.01234"),
+    versioned or full arXiv URLs.
+    """
+    ctx = _ids_context(ids)
+    return _generate(ctx) if ctx else None
+
+# ------------------------------------------------------------------ #
+def stream_ideas_from_topic(topic: str, k: int = 8, semantic: bool = False) -> Optional[Iterator[str]]:
+    """
+    Like ideate_from_topic, but returns an iterator over the generated text
+    as it is produced (None when no paper matches).
+
+    Example:
+    for text in stream_ideas_from_topic("diffusion"):
+        print(text, end="")
+    """
+    ctx = _topic_context(topic, k, semantic)
+    return _stream(ctx)
+
 
-    llm = load_pipe()
-    return llm(IDEA_PROMPT.format(context="\n".join(ctx)),
-               do_sample=False)[0]['generated_text'].strip()
\ No newline at end of file
+def stream_ideas_from_ids(ids: List[str]) -> Optional[Iterator[str]]:
+    """
+    Like ideate_from_ids, but streams the generated text.
+    """
+    ctx = _ids_context(ids)
+    return _stream(ctx)
@@ -0,0 +1,315 @@
+"""
+Staged ingest pipeline for large backfills.
+
+scrape() fetches, tags and writes in one thread, so the network, the CPU and
+SQLite take turns. ingest() runs the three as concurrent stages connected by
+bounded queues (config.INGEST_QUEUE_SIZE), so a slow stage blocks the one
+before it instead of buffering without limit:
+
+    fetch (threads)  ->  tag (process pool)  ->  write (one thread)
+
+- fetch: config.INGEST_FETCH_THREADS threads page through the queries
+  (arxiv_api.iter_pages, all sharing the process-wide rate limiter) and drop
+  papers already seen or stored.
+- tag: batches of config.TAG_BATCH_SIZE papers are embedded and tagged in a
+  pool of config.INGEST_TAG_PROCS processes (default: one per core; each loads
+  its own encoder, roughly 0.5 GB). Without tagging, papers pass straight on
+  with NULL tags, as in `harvest.py` without --tag.
+- write: the only connection that writes, committing config.INGEST_WRITE_BATCH
+  papers (and their vectors) per transaction.
+
+Ctrl-C stops fetching; papers already fetched are still tagged and written
+before ingest() returns (a second Ctrl-C aborts). Papers lost to an error are
+not stored, so the next run fetches them again. The report gives papers,
+seconds working, seconds blocked on the next stage and papers/s per stage.
+
+Example:
+python src/ingest.py --category cs.CL cs.LG --max-results 20000
+python src/ingest.py 'all:"diffusion"' --max-results 5000 --no-tag
+"""
+import argparse, json, multiprocessing, os, queue, signal, threading, time
+import concurrent.futures as cf
+import config
+import metrics
+from arxiv_api import iter_pages
+from db import get_conn, existing_ids, insert_papers
+from query_builder import build_query
+
+DONE = None                         # end-of-stream marker passed down the queues
+
+
+class Stage:
+    """
+    Throughput counters of one stage.
+    """
+    def __init__(self, name: str):
+        self.name    = name
+        self.papers  = 0
+        self.busy    = 0.0          # seconds spent working (summed over workers)
+        self.blocked = 0.0          # seconds waiting for room in the next queue
+        self.started = time.perf_counter()
+        self.ended   = None
+        self.lock    = threading.Lock()
+
+    def add(self, papers: int, seconds: float):
+        with self.lock:
+            self.papers += papers
+            self.busy   += seconds
+        metrics.record(f"ingest.{self.name}", seconds)
+        metrics.inc("ingest_papers", papers, stage=self.name)
+
+    def put(self, q, item):
+        """
+        Put `item` on the next stage's queue, counting the time blocked.
+        """
+        t0 = time.perf_counter()
+        q.put(item)
+        with self.lock:
+            self.blocked += time.perf_counter() - t0
+
+    def report(self) -> dict:
+        wall = (self.ended or time.perf_counter()) - self.started
+        return {"papers": self.papers, "seconds": round(wall, 2),
+                "busy_s": round(self.busy, 2), "blocked_s": round(self.blocked, 2),
+                "papers_per_s": round(self.papers / wall, 1) if wall else 0.0}
+
+
+# ---- tag stage workers (run in the pool processes) ---------------------- #
+def _init_tagger():
+    # the parent handles Ctrl-C and drains the pool; one torch thread per process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def tag_batch(docs):
+    """
+    Embeddings and KeyBERT tags for `docs`, as in scrape().
+    Returns (tags, embeddings).
+    """
+    from models import get_encoder
+    from scrape import make_tags_batch
+    embs = get_encoder().encode(docs, batch_size=config.TAG_BATCH_SIZE, normalize_embeddings=True)
+    return make_tags_batch(docs, embs), embs
+
+
+def _run_tagger(tagger, docs):
+    t0 = time.perf_counter()
+    tags, embs = tagger(docs)
+    return tags, embs, time.perf_counter() - t0
+
+
+def _procs() -> int:
+    if config.INGEST_TAG_PROCS:
+        return config.INGEST_TAG_PROCS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:          # macOS, Windows
+        return os.cpu_count() or 1
+
+
+# ---- stages -------------------------------------------------------------- #
+def _fetch(queries, max_results, out, stage, stop, seen, seen_lock, errors):
+    conn = get_conn()
+    while not stop.is_set():
+        try:
+            query = queries.get_nowait()
+        except queue.Empty:
+            return
+        pages = iter_pages(query, max_results=max_results, cache=False)  # stored in papers anyway
+        try:
+            while not stop.is_set():
+                t0   = time.perf_counter()
+                page = next(pages, None)
+                if page is None:
+                    break
+                with seen_lock:
+                    fresh = [p for p in page if p.id not in seen]
+                    seen.update(p.id for p in fresh)
+                stored = existing_ids(conn, (p.id for p in fresh))
+                fresh  = [p for p in fresh if p.id not in stored]
+                stage.add(len(fresh), time.perf_counter() - t0)
+                if fresh:
+                    stage.put(out, fresh)
+        except Exception as e:      # one failing query does not stop the others
+            errors.append(f"fetch {query!r}: {e!r}")
+
+
+def _tag(inp, out, stage, pool, procs, tagger, stop, errors):
+    inflight = {}                   # future -> papers
+
+    def forward(done):
+        for fut in done:
+            papers = inflight.pop(fut)
+            try:
+                tags, embs, seconds = fut.result()
+            except Exception as e:
+                errors.append(f"tag: {e!r}")
+                stop.set()
+                continue
+            stage.add(len(papers), seconds)
+            stage.put(out, (papers, tags, embs))
+
+    def submit(batch):
+        if pool is None:            # no tagging: NULL tags, no vectors
+            stage.add(len(batch), 0.0)
+            stage.put(out, (batch, [None] * len(batch), None))
+            return
+        docs = [doc_text(p.title, p.summary) for p in batch]
+        inflight[pool.submit(_run_tagger, tagger, docs)] = batch
+        # at most two batches per process in flight; beyond that we wait
+        if len(inflight) >= 2 * procs:
+            forward(cf.wait(inflight, return_when=cf.FIRST_COMPLETED).done)
+
+    from vectors import doc_text
+    size, batch, item = config.TAG_BATCH_SIZE, [], None
+    try:
+        while True:
+            item = inp.get()
+            if item is DONE:
+                break
+            batch += item
+            while len(batch) >= size:
+                submit(batch[:size])
+                batch = batch[size:]
+            if batch and inp.empty():   # don't hold a partial batch while fetching waits
+                submit(batch)
+                batch = []
+            forward([f for f in list(inflight) if f.done()])
+        if batch:
+            submit(batch)
+        forward(cf.wait(inflight).done)
+    except Exception as e:          # e.g. a pool process died: stop, but let the others finish
+        errors.append(f"tag: {e!r}")
+        stop.set()
+        while item is not DONE:
+            item = inp.get()
+    finally:
+        out.put(DONE)
+        stage.ended = time.perf_counter()
+
+
+def _write(inp, stage, write_batch, stop, errors):
+    conn = get_conn()
+    papers, tags, embs = [], [], []
+
+    def flush():
+        if not papers:
+            return
+        t0 = time.perf_counter()
+        try:
+            rows = [(p.id, p.title, ", ".join(p.authors), p.summary, p.published, None, t)
+                    for p, t in zip(papers, tags)]
+            insert_papers(conn, rows, [p.categories for p in papers])
+            if embs:
+                import numpy as np
+                from vectors import add_vectors
+                add_vectors(conn, [p.id for p in papers], np.concatenate(embs))
+            stage.add(len(papers), time.perf_counter() - t0)
+        except Exception as e:      # keep draining so the stages before us never block
+            errors.append(f"write: {e!r}")
+            stop.set()
+        papers.clear(); tags.clear(); embs.clear()
+
+    while True:
+        try:
+            item = inp.get(timeout=1.0)
+        except queue.Empty:         # idle: commit what we have
+            flush()
+            continue
+        if item is DONE:
+            break
+        batch, batch_tags, batch_embs = item
+        papers.extend(batch)
+        tags.extend(batch_tags)
+        if batch_embs is not None:
+            embs.append(batch_embs)
+        if len(papers) >= write_batch:
+            flush()
+    flush()
+    stage.ended = time.perf_counter()
+
+
+# ---- pipeline ------------------------------------------------------------ #
+def ingest(queries, max_results: int = 1000, tag: bool = True, fetch_threads: int = None,
+           tag_procs: int = None, write_batch: int = None, tagger=tag_batch) -> dict:
+    """
+    Fetch up to `max_results` results for each arXiv query, then tag and store
+    the new papers, running the three stages concurrently. `tagger(docs)` must
+    be a module-level function returning (tags, embeddings); it runs in the
+    process pool.
+    Returns the per-stage report, with "errors" listing anything that failed.
+    """
+    fetch_threads = fetch_threads or config.INGEST_FETCH_THREADS
+    write_batch   = write_batch or config.INGEST_WRITE_BATCH
+    procs         = (tag_procs or _procs()) if tag else 0
+
+    todo = queue.Queue()
+    for q in queries:
+        todo.put(q)
+    to_tag   = queue.Queue(config.INGEST_QUEUE_SIZE)
+    to_write = queue.Queue(config.INGEST_QUEUE_SIZE)
+    stop, errors = threading.Event(), []
+    seen, seen_lock = set(), threading.Lock()
+    stages = {name: Stage(name) for name in ("fetch", "tag", "write")}
+    pool   = cf.ProcessPoolExecutor(procs, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_init_tagger) if procs else None
+
+    def on_sigint(signum, frame):
+        if stop.is_set():
+            raise KeyboardInterrupt
+        stop.set()
+        print("[ingest] stopping: finishing papers already fetched (Ctrl-C again to abort)")
+
+    handler = None
+    if threading.current_thread() is threading.main_thread():
+        handler = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        fetchers = [threading.Thread(target=_fetch, name=f"ingest-fetch-{i}", daemon=True,
+                                     args=(todo, max_results, to_tag, stages["fetch"],
+                                           stop, seen, seen_lock, errors))
+                    for i in range(min(fetch_threads, len(queries)) or 1)]
+        tagger_t = threading.Thread(target=_tag, name="ingest-tag", daemon=True,
+                                    args=(to_tag, to_write, stages["tag"], pool, procs, tagger, stop, errors))
+        writer_t = threading.Thread(target=_write, name="ingest-write", daemon=True,
+                                    args=(to_write, stages["write"], write_batch, stop, errors))
+        for t in fetchers + [tagger_t, writer_t]:
+            t.start()
+        for t in fetchers:
+            t.join()
+        stages["fetch"].ended = time.perf_counter()
+        to_tag.put(DONE)
+        tagger_t.join()
+        writer_t.join()
+    finally:
+        if handler is not None:
+            signal.signal(signal.SIGINT, handler)
+        if pool is not None:
+            pool.shutdown()
+
+    report = {name: s.report() for name, s in stages.items()}
+    report["tag_procs"] = procs
+    report["interrupted"] = stop.is_set() and not errors
+    report["errors"] = errors
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Backfill papers with a staged fetch/tag/write pipeline.")
+    ap.add_argument("queries", nargs="*", help='arXiv queries, e.g. \'all:"diffusion"\'')
+    ap.add_argument("--category", nargs="+", default=[], help="e.g. cs.CL cs.LG (one query each)")
+    ap.add_argument("--max-results", type=int, default=1000, help="results fetched per query")
+    ap.add_argument("--no-tag", action="store_true", help="store papers without tags or vectors")
+    ap.add_argument("--fetch-threads", type=int, default=config.INGEST_FETCH_THREADS)
+    ap.add_argument("--tag-procs", type=int, default=config.INGEST_TAG_PROCS,
+                    help="tagging processes (0: one per core)")
+    ap.add_argument("--write-batch", type=int, default=config.INGEST_WRITE_BATCH)
+    args = ap.parse_args()
+
+    queries = list(args.queries) + [build_query(category=c) for c in args.category]
+    if not queries:
+        ap.error("give queries or --category")
+    report = ingest(queries, args.max_results, not args.no_tag, args.fetch_threads,
+                    args.tag_procs, args.write_batch)
+    print(json.dumps(report, indent=2))
+    raise SystemExit(1 if report["errors"] else 0)
@@ -0,0 +1,155 @@
+"""
+SQLite-backed queue of summarisation jobs (table `summary_jobs`).
+
+There is one job per paper whose summary is still NULL. A job moves through
+
+    pending -> claimed -> done
+                       -> pending (retry)  -> ... -> failed
+
+Workers claim jobs under a lease inside a `BEGIN IMMEDIATE` transaction, so
+several worker processes can share the same database without handing out the
+same paper twice. A claimed job whose lease has expired (the worker died) is
+handed out again; every claim counts as an attempt and a job is marked failed
+after MAX_ATTEMPTS.
+
+Example:
+enqueue_pending("diffusion", priority=1)
+jobs = claim("host:1234", n=8)          # [(paper_id, abstract), ...]
+complete("host:1234", [(summary, paper_id), ...])
+"""
+import time
+from db import get_conn, set_summaries, transaction
+from search import match_filter, search_papers
+
+LEASE_SECONDS = 600   # how long a claimed job belongs to a worker
+MAX_ATTEMPTS  = 3     # claims per job before it is marked failed
+
+
+def enqueue_pending(keyword: str = None, limit: int = None, priority: int = 0, conn=None) -> int:
+    """
+    Queue a job for every paper whose summary is NULL (newest first), or only
+    for the best `keyword` matches, at most `limit` of them.
+    Papers that are already queued keep their job but are bumped to `priority`.
+    Returns the number of jobs inserted or bumped.
+    """
+    conn  = conn or get_conn()
+    limit = -1 if limit is None else limit
+    if keyword:
+        ids = search_papers(keyword, limit, fields="p.id",
+                            where="AND p.summarised = 0", conn=conn)
+    else:
+        ids = conn.execute(
+            "SELECT id FROM papers WHERE summarised = 0 "
+            "ORDER BY published DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    return enqueue([pid for pid, in ids], priority, conn)
+
+
+def enqueue(paper_ids, priority: int = 0, conn=None) -> int:
+    """
+    Queue jobs for `paper_ids` (papers already summarised are skipped).
+    Papers that are already queued keep their job but are bumped to `priority`.
+    Returns the number of jobs inserted or bumped.
+    """
+    conn = conn or get_conn()
+    now  = time.time()
+    with conn:
+        cur = conn.executemany(
+            "INSERT INTO summary_jobs(paper_id, priority, enqueued, updated) "
+            "SELECT id, ?, ?, ? FROM papers WHERE id = ? AND summarised = 0 "
+            "ON CONFLICT(paper_id) DO UPDATE SET priority = excluded.priority "
+            "WHERE summary_jobs.status = 'pending' "
+            "AND summary_jobs.priority < excluded.priority",
+            [(priority, now, now, pid) for pid in paper_ids]
+        )
+    return cur.rowcount
+
+
+def claim(worker: str, n: int, conn=None):
+    """
+    Lease up to `n` jobs to `worker`, highest priority first.
+    Returns [(paper_id, abstract), ...].
+    """
+    now = time.time()
+    with transaction(conn) as conn:          # take the write lock before reading
+        # leases that ran out on their last attempt are given up on
+        conn.execute(
+            "UPDATE summary_jobs SET status='failed', error='lease expired', updated=? "
+            "WHERE status='claimed' AND lease_until < ? AND attempts >= ?",
+            (now, now, MAX_ATTEMPTS)
+        )
+        rows = conn.execute(
+            "SELECT j.paper_id, unpack(t.abstract) FROM summary_jobs j "
+            "JOIN papers p ON p.id = j.paper_id "
+            "LEFT JOIN paper_text t ON t.paper_id = j.paper_id "
+            "WHERE (j.status = 'pending' OR (j.status = 'claimed' AND j.lease_until < ?)) "
+            "AND p.summarised = 0 "
+            "ORDER BY j.priority DESC, j.enqueued LIMIT ?", (now, n)
+        ).fetchall()
+        conn.executemany(
+            "UPDATE summary_jobs SET status='claimed', worker=?, lease_until=?, "
+            "attempts=attempts+1, updated=? WHERE paper_id=?",
+            [(worker, now + LEASE_SECONDS, now, pid) for pid, _ in rows]
+        )
+    return rows
+
+
+def complete(worker: str, results, conn=None):
+    """
+    Store (summary, paper_id) results and mark their jobs done, in one transaction.
+    """
+    conn = conn or get_conn()
+    now  = time.time()
+    with conn:
+        set_summaries(conn, results)
+        conn.executemany(
+            "UPDATE summary_jobs SET status='done', error=NULL, lease_until=NULL, updated=? "
+            "WHERE paper_id=? AND worker=?",
+            [(now, pid, worker) for _, pid in results]
+        )
+
+
+def fail(worker: str, paper_ids, error: str, conn=None):
+    """
+    Release `paper_ids` after an error: back to pending, or failed once
+    MAX_ATTEMPTS claims have been used up.
+    """
+    conn = conn or get_conn()
+    with conn:
+        conn.executemany(
+            "UPDATE summary_jobs SET "
+            "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error=?, lease_until=NULL, updated=? WHERE paper_id=? AND worker=?",
+            [(MAX_ATTEMPTS, error[:500], time.time(), pid, worker) for pid in paper_ids]
+        )
+
+
+def progress(keyword: str = None, paper_ids=None, conn=None) -> dict:
+    """
+    Summary progress for papers matching `keyword`, or for `paper_ids`
+    (all papers if neither is given).
+
+    Example:
+    progress("diffusion") -> {"done": 12, "pending": 3, "claimed": 1, "failed": 0, ...}
+    """
+    conn = conn or get_conn()
+    sql  = ("SELECT CASE WHEN p.summarised THEN 'done' "
+            "ELSE COALESCE(j.status, 'unqueued') END AS s, COUNT(*) "
+            "FROM papers p LEFT JOIN summary_jobs j ON j.paper_id = p.id")
+    args = []
+    counts = {"done": 0, "pending": 0, "claimed": 0, "failed": 0, "unqueued": 0}
+    if paper_ids is not None:
+        if not paper_ids:
+            return counts
+        sql += f" WHERE p.id IN ({','.join('?' * len(paper_ids))})"
+        args += list(paper_ids)
+    elif keyword:
+        match = match_filter(keyword, "p")
+        if not match:
+            return counts
+        sql += f" WHERE {match[0]}"
+        args.append(match[1])
+    for status, n in conn.execute(sql + " GROUP BY s", args):
+        counts[status] = counts.get(status, 0) + n
+    return counts
@@ -0,0 +1,116 @@
+"""
+SQLite key/value cache tables, shared by llm_cache.py and arxiv_cache.py.
+
+A table has `key` (primary key), `response` and `created` (unix time) columns,
+plus `last_used` and `hits` when entries are evicted least recently used
+first (see db.MIGRATIONS 6 and 7). Hits and misses are counted per kind in
+this process and in metrics as ra_<table>_hits_total / _misses_total.
+
+Example:
+cache = KVCache("llm_cache", lru=True)
+cache.store_many([("k1", "text")], model="m", evict=lambda conn: cache.trim(1000, conn))
+cache.lookup_many(["k1", "k2"], ttl=86400)     # {"k1": "text"}
+"""
+import threading, time
+import metrics
+from db import get_conn
+
+
+class KVCache:
+    """
+    Lookups, stores, eviction and stats of one cache table.
+    """
+    def __init__(self, table: str, lru: bool = False):
+        self.table   = table
+        self.lru     = lru
+        self._counts = {}           # kind -> {"hits": n, "misses": n}
+        self._lock   = threading.Lock()
+
+    def count(self, hits: int, misses: int, kind: str = None):
+        with self._lock:
+            c = self._counts.setdefault(kind, {"hits": 0, "misses": 0})
+            c["hits"]   += hits
+            c["misses"] += misses
+        labels = {"kind": kind} if kind else {}
+        metrics.inc(f"{self.table}_hits", hits, **labels)
+        metrics.inc(f"{self.table}_misses", misses, **labels)
+
+    def lookup_many(self, keys, ttl: float, kind: str = None, conn=None) -> dict:
+        """
+        Stored responses for `keys` created less than `ttl` seconds ago, as
+        {key: response}. Counts hits and misses under `kind` and, for an LRU
+        table, refreshes last_used.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys or ttl <= 0:
+            return {}
+        conn  = conn or get_conn()
+        now   = time.time()
+        found = dict(conn.execute(
+            f"SELECT key, response FROM {self.table} WHERE created >= ? "
+            f"AND key IN ({','.join('?' * len(keys))})", [now - ttl, *keys]
+        ))
+        if found and self.lru:
+            with conn:
+                conn.executemany(f"UPDATE {self.table} SET last_used=?, hits=hits + 1 WHERE key=?",
+                                 [(now, k) for k in found])
+        self.count(len(found), len(keys) - len(found), kind)
+        return found
+
+    def store_many(self, items, evict=None, conn=None, **columns):
+        """
+        Insert or replace (key, response) pairs, with the same value of every
+        extra column in `columns`, then call evict(conn) in the same transaction.
+        """
+        items = list(items)
+        if not items:
+            return
+        conn  = conn or get_conn()
+        now   = time.time()
+        names = ["key", "response", "created", *(["last_used"] if self.lru else []), *columns]
+        extra = [now, *([now] if self.lru else []), *columns.values()]
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table}({', '.join(names)}) "
+                f"VALUES ({', '.join('?' * len(names))})",
+                [(k, r, *extra) for k, r in items]
+            )
+            if evict:
+                evict(conn)
+
+    def expire(self, max_age: float, where: str = "", conn=None) -> int:
+        """
+        Drop entries created more than `max_age` seconds ago (and matching
+        `where`, starting with AND). Returns the number removed.
+        """
+        conn = conn or get_conn()
+        return conn.execute(f"DELETE FROM {self.table} WHERE created < ? {where}",
+                            (time.time() - max_age,)).rowcount
+
+    def trim(self, entries: int, conn=None) -> int:
+        """
+        Drop all but the `entries` most recently used. Returns the number removed.
+        """
+        conn = conn or get_conn()
+        return conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+            f"ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (entries,)
+        ).rowcount
+
+    def stats(self, conn=None) -> dict:
+        """
+        Hits and misses per kind in this process (kind None: the counts of
+        lookups without a kind) plus entries and size of the table.
+        """
+        conn = conn or get_conn()
+        entries, size = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(length(response)), 0) FROM {self.table}"
+        ).fetchone()
+        with self._lock:
+            counts = {kind: dict(c) for kind, c in self._counts.items()}
+        return {**counts, "entries": entries, "mb": round(size / 2**20, 2)}
+
+    def clear(self, conn=None):
+        conn = conn or get_conn()
+        with conn:
+            conn.execute(f"DELETE FROM {self.table}")
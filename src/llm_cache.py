@@ -0,0 +1,118 @@
+"""
+Persistent cache of LLM results (table llm_cache).
+
+Generation with do_sample=False is deterministic, so the text produced for a
+given model, prompt and set of generation kwargs is stored under a hash of all
+three and returned straight from SQLite the next time. Entries older than
+config.LLM_CACHE_TTL_DAYS are regenerated, and only the
+config.LLM_CACHE_ENTRIES most recently used are kept. Sampled calls
+(do_sample=True) bypass the cache.
+
+Example:
+text = cached_generate(prompt, lambda p, **kw: llm(p, **kw)[0]["generated_text"],
+                       do_sample=False)
+cache_stats()   # {"hits": 12, "misses": 3, "entries": 3, "mb": 0.01}
+"""
+import hashlib, json
+import config
+from kv_cache import KVCache
+
+_cache = KVCache("llm_cache", lru=True)
+
+
+def cache_key(prompt: str, model_name: str = None, **gen_kwargs) -> str:
+    """
+    Hash of the model name (default config.MODEL_NAME), the full prompt and
+    the generation kwargs.
+    """
+    blob = json.dumps([model_name or config.MODEL_NAME, prompt, gen_kwargs],
+                      sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def cacheable(gen_kwargs: dict) -> bool:
+    return not gen_kwargs.get("do_sample", False)
+
+
+def lookup_many(keys, conn=None) -> dict:
+    """
+    Cached responses for `keys` that are present and not expired, as
+    {key: response}. Counts hits and misses and refreshes last_used.
+    """
+    return _cache.lookup_many(keys, config.LLM_CACHE_TTL_DAYS * 86400, conn=conn)
+
+
+def lookup(key: str, conn=None):
+    """
+    Cached response for `key`, or None.
+    """
+    return lookup_many([key], conn).get(key)
+
+
+def store_many(items, model_name: str = None, conn=None):
+    """
+    Store (key, response) pairs, then evict expired and least recently used entries.
+    """
+    _cache.store_many(items, evict, conn, model=model_name or config.MODEL_NAME)
+
+
+def store(key: str, response: str, model_name: str = None, conn=None):
+    store_many([(key, response)], model_name, conn)
+
+
+def evict(conn=None) -> int:
+    """
+    Drop expired entries and all but the config.LLM_CACHE_ENTRIES most
+    recently used. Returns the number of entries removed.
+    """
+    return (_cache.expire(config.LLM_CACHE_TTL_DAYS * 86400, conn=conn)
+            + _cache.trim(config.LLM_CACHE_ENTRIES, conn))
+
+
+def cached_generate(prompt: str, generate, model_name: str = None, **gen_kwargs) -> str:
+    """
+    generate(prompt, **gen_kwargs), unless the same call to `model_name`
+    (default config.MODEL_NAME) has been cached.
+    """
+    if not cacheable(gen_kwargs):
+        return generate(prompt, **gen_kwargs)
+    key = cache_key(prompt, model_name, **gen_kwargs)
+    hit = lookup(key)
+    if hit is not None:
+        return hit
+    text = generate(prompt, **gen_kwargs)
+    store(key, text, model_name)
+    return text
+
+
+def cached_stream(prompt: str, stream, model_name: str = None, **gen_kwargs):
+    """
+    Streaming counterpart of cached_generate: yields the cached text at once,
+    otherwise the chunks of stream(prompt, **gen_kwargs), caching their
+    concatenation once the stream is exhausted.
+    """
+    if not cacheable(gen_kwargs):
+        yield from stream(prompt, **gen_kwargs)
+        return
+    key = cache_key(prompt, model_name, **gen_kwargs)
+    hit = lookup(key)
+    if hit is not None:
+        yield hit
+        return
+    parts = []
+    for text in stream(prompt, **gen_kwargs):
+        parts.append(text)
+        yield text
+    store(key, "".join(parts).strip(), model_name)
+
+
+def cache_stats(conn=None) -> dict:
+    """
+    Hits and misses in this process plus size of the persistent cache.
+    """
+    stats = _cache.stats(conn)
+    return {**stats.pop(None, {"hits": 0, "misses": 0}), **stats}
+
+
+def clear(conn=None):
+    _cache.clear(conn)
@@ -0,0 +1,210 @@
+"""
+Lightweight tracing and metrics for the whole app.
+
+span(name) times a block: the duration goes into a histogram (exported as
+ra_span_seconds{span=name}) and, while a trace is active in the thread, into
+that trace, e.g. for the Streamlit sidebar's timing panel. inc() and observe()
+record counters and other histograms. render() gives everything in the
+Prometheus text format; start_server() serves it at /metrics (FastAPI +
+uvicorn) from a background thread of the current process, since metrics live
+in the process that produced them.
+
+Example:
+with span("scrape.tag", papers=len(docs)):
+    tags = make_tags_batch(docs)
+inc("llm_output_tokens", 150, backend="openai")
+
+start_trace()
+...                               # run a request
+for name, n, ms in trace_summary(stop_trace()): print(name, n, ms)
+
+start_server(9100)                # curl localhost:9100/metrics
+"""
+import contextlib, threading, time
+import config
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+PREFIX  = "ra_"
+
+_lock       = threading.Lock()
+_counters   = {}          # (name, labels) -> value
+_histograms = {}          # (name, labels) -> [bucket counts..., sum, count]
+_local      = threading.local()
+
+
+def _key(name: str, labels: dict):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    """
+    Add `value` to the counter `name` (exported as ra_<name>_total).
+    """
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels):
+    """
+    Record `value` in the histogram `name`.
+    """
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, le in enumerate(BUCKETS):
+            if value <= le:
+                h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+
+def record(name: str, seconds: float, **labels):
+    """
+    Record a finished span: histogram ra_span_seconds{span=name} plus the
+    active trace of this thread, if any.
+    """
+    observe("span_seconds", seconds, span=name, **labels)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.append((name, seconds, labels))
+
+
+@contextlib.contextmanager
+def span(name: str, **labels):
+    """
+    Time the enclosed block as span `name`.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0, **labels)
+
+
+def timed_iter(iterable, name: str, **labels):
+    """
+    Yield from `iterable`, timing each step as span `name` (e.g. the network
+    requests behind a paging generator), excluding the consumer's time.
+    """
+    it = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            record(name, time.perf_counter() - t0, **labels)
+            return
+        record(name, time.perf_counter() - t0, **labels)
+        yield item
+
+
+# ---- per-request traces ------------------------------------------------ #
+def start_trace():
+    """
+    Collect the spans of this thread from now on (replacing any earlier trace).
+    """
+    _local.trace = []
+
+
+def stop_trace():
+    """
+    Stop collecting and return the spans as [(name, seconds, labels), ...].
+    """
+    trace, _local.trace = getattr(_local, "trace", None) or [], None
+    return trace
+
+
+def trace_summary(trace):
+    """
+    Spans of a trace grouped by name, slowest first, as [(name, count, ms), ...].
+    """
+    totals = {}
+    for name, seconds, _ in trace:
+        n, s = totals.get(name, (0, 0.0))
+        totals[name] = (n + 1, s + seconds)
+    return sorted(((name, n, round(s * 1000, 1)) for name, (n, s) in totals.items()),
+                  key=lambda r: -r[2])
+
+
+# ---- export ------------------------------------------------------------ #
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def snapshot() -> dict:
+    """
+    Copy of all counters and histograms.
+    """
+    with _lock:
+        return {"counters": dict(_counters),
+                "histograms": {k: list(v) for k, v in _histograms.items()}}
+
+
+def render() -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    snap  = snapshot()
+    lines = []
+    for name in sorted({n for n, _ in snap["counters"]}):
+        lines.append(f"# TYPE {PREFIX}{name}_total counter")
+        for (n, labels), value in sorted(snap["counters"].items()):
+            if n == name:
+                lines.append(f"{PREFIX}{name}_total{_labels(labels)} {value}")
+    for name in sorted({n for n, _ in snap["histograms"]}):
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        for (n, labels), h in sorted(snap["histograms"].items()):
+            if n != name:
+                continue
+            for le, count in zip(BUCKETS, h):
+                lines.append(f"{PREFIX}{name}_bucket{_labels(labels, [('le', le)])} {count}")
+            lines.append(f"{PREFIX}{name}_bucket{_labels(labels, [('le', '+Inf')])} {h[-1]}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {h[-2]}")
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {h[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def create_app():
+    """
+    FastAPI app exposing GET /metrics.
+    """
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+
+    app = FastAPI(title="research assistant metrics")
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+_server = None
+
+
+def start_server(port: int = None, host: str = "0.0.0.0"):
+    """
+    Serve /metrics on `port` (default config.METRICS_PORT) from a daemon
+    thread of this process. Only the first call starts a server.
+    """
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        import uvicorn
+        cfg = uvicorn.Config(create_app(), host=host, port=port or config.METRICS_PORT,
+                             log_level="warning")
+        _server = uvicorn.Server(cfg)
+    threading.Thread(target=_server.run, daemon=True, name="metrics").start()
+    return _server
@@ -0,0 +1,270 @@
+"""
+Process-wide registry of loaded LLM pipelines and embedding models.
+
+Loading the 8B model takes tens of seconds, so every caller (Streamlit sessions,
+background threads, CLI tools) shares the pipelines held here. A model is loaded
+lazily the first time it is asked for and kept until it is evicted. When more
+than `config.MODEL_CACHE_SIZE` models are requested (e.g. after switching
+`config.MODEL_NAME` at runtime) the least recently used one is dropped *before*
+the new one is loaded, so two copies never sit in memory at once.
+
+Example:
+pipe = get_pipe()                 # loads config.MODEL_NAME once per process
+config.MODEL_NAME = "other/model"
+pipe = get_pipe()                 # evicts the previous model, loads the new one
+model_stats()                     # load time and memory per loaded model
+get_encoder()                     # sentence embeddings (tagging, semantic search)
+for text in stream_generate(prompt, max_new_tokens=200):
+    print(text, end="")           # tokens as they are produced
+"""
+import gc, os, pathlib, tempfile, threading, time
+from collections import OrderedDict
+import config
+import metrics
+
+CACHE_DIR = pathlib.Path(tempfile.gettempdir()) / "hf_cache"
+
+_pipes     = OrderedDict()      # model name -> pipeline, most recently used last
+_stats     = {}                 # model name -> load statistics
+_lock      = threading.Lock()   # guards _pipes / _stats
+_load_lock = threading.Lock()   # one model load at a time
+_gen_stats = {}                 # model name -> streaming latency (time to first token, total)
+_tokenizers = {}                # model name -> tokenizer loaded without its model
+_encoders   = {}                # sentence-transformers model name -> encoder
+_keybert    = None
+_encoder_lock = threading.Lock()
+
+
+def _rss_mb() -> float:
+    """
+    Resident memory of this process in MB (peak RSS where /proc is unavailable).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource, sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _build_pipe(model_name: str):
+    from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        cache_dir=CACHE_DIR,
+        device_map="auto"
+    )
+    tok   = AutoTokenizer.from_pretrained(model_name, cache_dir=CACHE_DIR)
+    tok.pad_token = tok.eos_token
+    tok.padding_side = "left"      # decoder-only models must be left padded for batching
+    return pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tok,
+        do_sample=False,
+        return_full_text=False,
+    )
+
+
+def _release_memory():
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+def _evict(keep: int):
+    """
+    Drop least recently used pipelines until at most `keep` remain.
+    Pipelines still in use by another thread stay alive until that call returns.
+    """
+    with _lock:
+        evicted = []
+        while len(_pipes) > keep:
+            name, _ = _pipes.popitem(last=False)
+            _stats.pop(name, None)
+            evicted.append(name)
+    if evicted:
+        _release_memory()
+
+
+def get_pipe(model_name: str = None):
+    """
+    Return the shared text-generation pipeline for `model_name`
+    (default: the current value of config.MODEL_NAME), loading it on first use.
+    """
+    name = model_name or config.MODEL_NAME
+    with _lock:
+        if name in _pipes:
+            _pipes.move_to_end(name)
+            return _pipes[name]
+
+    with _load_lock:
+        # another thread may have finished loading it while we waited
+        with _lock:
+            if name in _pipes:
+                _pipes.move_to_end(name)
+                return _pipes[name]
+
+        _evict(max(config.MODEL_CACHE_SIZE - 1, 0))
+        rss_before = _rss_mb()
+        t0 = time.perf_counter()
+        pipe = _build_pipe(name)
+        load_s = time.perf_counter() - t0
+        metrics.record("model.load", load_s, model=name)
+
+        footprint = None
+        if hasattr(pipe.model, "get_memory_footprint"):
+            footprint = pipe.model.get_memory_footprint() / 2**20
+        with _lock:
+            _pipes[name] = pipe
+            _stats[name] = {
+                "load_seconds": round(load_s, 2),
+                "model_mb":     round(footprint, 1) if footprint else None,
+                "rss_mb":       round(_rss_mb(), 1),
+                "rss_delta_mb": round(_rss_mb() - rss_before, 1),
+                "loaded_at":    time.time(),
+            }
+        return pipe
+
+
+def get_tokenizer(model_name: str = None):
+    """
+    Tokenizer of `model_name` (default config.MODEL_NAME): the loaded
+    pipeline's if there is one, else loaded on its own (fast, no weights),
+    e.g. to count prompt tokens before deciding whether to generate.
+    """
+    name = model_name or config.MODEL_NAME
+    with _lock:
+        if name in _pipes:
+            return _pipes[name].tokenizer
+        if name in _tokenizers:
+            return _tokenizers[name]
+    from transformers import AutoTokenizer
+    tok = AutoTokenizer.from_pretrained(name, cache_dir=CACHE_DIR)
+    with _lock:
+        return _tokenizers.setdefault(name, tok)
+
+
+def get_encoder(model_name: str = None):
+    """
+    Shared SentenceTransformer (default config.ENCODER_NAME) used for tagging
+    and the semantic index, loaded on first use.
+    """
+    name = model_name or config.ENCODER_NAME
+    with _lock:
+        if name in _encoders:
+            return _encoders[name]
+    with _encoder_lock:
+        with _lock:
+            if name in _encoders:
+                return _encoders[name]
+        from sentence_transformers import SentenceTransformer
+        t0  = time.perf_counter()
+        enc = SentenceTransformer(name, cache_folder=str(CACHE_DIR))
+        metrics.record("model.load", time.perf_counter() - t0, model=name)
+        with _lock:
+            _encoders[name] = enc
+        return enc
+
+
+def get_keybert():
+    """
+    Shared KeyBERT keyword extractor on top of get_encoder().
+    """
+    global _keybert
+    encoder = get_encoder()
+    with _encoder_lock:
+        if _keybert is None:
+            from keybert import KeyBERT
+            _keybert = KeyBERT(encoder)
+        return _keybert
+
+
+def unload(model_name: str = None):
+    """
+    Drop one model (or all of them when `model_name` is None) from the registry.
+    """
+    with _lock:
+        names = [model_name] if model_name else list(_pipes)
+        for name in names:
+            _pipes.pop(name, None)
+            _stats.pop(name, None)
+    _release_memory()
+
+
+def record_generation(name: str, ttft: float, total: float):
+    with _lock:
+        s = _gen_stats.setdefault(name, {"calls": 0, "ttft_sum": 0.0, "total_sum": 0.0})
+        s["calls"]     += 1
+        s["ttft_sum"]  += ttft
+        s["total_sum"] += total
+        s["last_ttft_s"], s["last_total_s"] = round(ttft, 3), round(total, 3)
+    metrics.record("llm.ttft", ttft, model=name)
+    metrics.record("llm.total", total, model=name)
+
+
+def stream_generate(prompt: str, model_name: str = None, **gen_kwargs):
+    """
+    Generate from `prompt`, yielding text as it is produced. generate() runs in
+    a worker thread feeding a transformers TextIteratorStreamer; time to first
+    token and total latency are recorded per model (see model_stats).
+    """
+    from transformers import TextIteratorStreamer
+
+    name     = model_name or config.MODEL_NAME
+    pipe     = get_pipe(name)
+    streamer = TextIteratorStreamer(pipe.tokenizer, skip_prompt=True, skip_special_tokens=True)
+    error    = []
+
+    def run():
+        try:
+            pipe(prompt, streamer=streamer, **gen_kwargs)
+        except Exception as e:              # surface in the consuming thread
+            error.append(e)
+            streamer.end()
+
+    t0, ttft = time.perf_counter(), None
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    for text in streamer:
+        if not text:
+            continue
+        if ttft is None:
+            ttft = time.perf_counter() - t0
+        yield text
+    thread.join()
+    if error:
+        raise error[0]
+    total = time.perf_counter() - t0
+    record_generation(name, total if ttft is None else ttft, total)
+
+
+def model_stats() -> dict:
+    """
+    Load statistics of the currently loaded models, streaming latency per model
+    and current process RSS.
+
+    Example:
+    {"models": {"unsloth/llama-3-8b-Instruct-bnb-4bit": {"load_seconds": 23.4, ...}},
+     "generation": {"unsloth/llama-3-8b-Instruct-bnb-4bit":
+                    {"calls": 3, "mean_ttft_s": 0.41, "mean_total_s": 9.8, ...}},
+     "rss_mb": 6120.5}
+    """
+    with _lock:
+        models = {name: dict(s) for name, s in _stats.items()}
+        generation = {
+            name: {"calls": s["calls"],
+                   "mean_ttft_s":  round(s["ttft_sum"] / s["calls"], 3),
+                   "mean_total_s": round(s["total_sum"] / s["calls"], 3),
+                   "last_ttft_s":  s["last_ttft_s"],
+                   "last_total_s": s["last_total_s"]}
+            for name, s in _gen_stats.items()
+        }
+    return {"models": models, "generation": generation, "rss_mb": round(_rss_mb(), 1)}
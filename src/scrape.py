@@ -1,7 +1,10 @@
-import time, arxiv
 from query_builder import build_query
-from db import get_conn
-from config import MAX_RESULTS
+from arxiv_api import iter_pages
+from db import get_conn, existing_ids, insert_papers
+from config import MAX_RESULTS, TAG_BATCH_SIZE
+from vectors import add_vectors, doc_text
+from models import get_encoder, get_keybert
+from metrics import span, timed_iter
 import os, pathlib, tempfile,uuid, shutil
 
 # set-up code for huggingface spaces
@@ -18,14 +21,14 @@ for var in (
 
 os.environ["XDG_CACHE_HOME"] = str(pathlib.Path(tempfile.gettempdir()) / ".cache")
 
-from sentence_transformers import SentenceTransformer
-from keybert import KeyBERT
-
-st_model = SentenceTransformer(
-    "sentence-transformers/all-MiniLM-L6-v2",
-    cache_folder=str(CACHE_DIR)          # explicit path
-)
-kw_model = KeyBERT(st_model)
+# the encoder and KeyBERT are loaded on first use (models.get_encoder / get_keybert),
+# so importing this module stays cheap
+def __getattr__(name):
+    if name == "st_model":
+        return get_encoder()
+    if name == "kw_model":
+        return get_keybert()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 """
 # For my Mac
@@ -48,61 +51,80 @@ st_model = SentenceTransformer(
 kw_model = KeyBERT(st_model)
 """
 
-def make_tags(title, abstract, top_n=5):
+def make_tags_batch(docs, doc_embeddings=None, top_n=5, batch_size=TAG_BATCH_SIZE):
     """
-    Extract keywords from the title and abstract using KeyBERT.
+    Extract keywords for many documents at once using KeyBERT.
+    All documents share one candidate vocabulary, so word embeddings are
+    computed once per batch, and `doc_embeddings` (from get_encoder().encode) are
+    reused instead of running the encoder again.
+    Returns one comma-joined tag string per document.
+
+    Example:
+    docs = [doc_text(t, a) for t, a in papers]
+    embs = get_encoder().encode(docs, batch_size=64, normalize_embeddings=True)
+    make_tags_batch(docs, embs)
     """
-    phrases = kw_model.extract_keywords(f"{title}. {abstract}",
+    if not docs:
+        return []
+    if doc_embeddings is None:
+        doc_embeddings = get_encoder().encode(docs, batch_size=batch_size,
+                                              normalize_embeddings=True)
+    phrases = get_keybert().extract_keywords(docs,
                                    top_n=top_n,
                                    stop_words="english",
-                                   use_mmr=True)
-    return ", ".join(p for p, _ in phrases)
+                                   use_mmr=True,
+                                   doc_embeddings=doc_embeddings)
+    # KeyBERT returns a flat list of (phrase, score) for a single document
+    if len(docs) == 1 and (not phrases or isinstance(phrases[0], tuple)):
+        phrases = [phrases]
+    return [", ".join(p for p, _ in doc) for doc in phrases]
+
+def make_tags(title, abstract, top_n=5):
+    """
+    Extract keywords from the title and abstract using KeyBERT.
+    """
+    return make_tags_batch([doc_text(title, abstract)], top_n=top_n)[0]
 
 def scrape(max_results=MAX_RESULTS, **criteria):
-    query  = build_query(**criteria)
-    search = arxiv.Search(query=query,
-                          max_results=max_results * 3,  # Get more results to filter from
-                          sort_by=arxiv.SortCriterion.SubmittedDate)
-
-    conn = get_conn()
-    search_results = []  # Track papers from current search that aren't in database
-    papers_added = 0
-    
-    for p in search.results():
-        # Check if paper already exists in database
-        existing = conn.execute("SELECT id FROM papers WHERE id=?", (p.entry_id,)).fetchone()
-        
-        if not existing and papers_added < max_results:
-            # Paper doesn't exist, add it
-            tags = make_tags(p.title, p.summary)
-            conn.execute(
-                "INSERT INTO papers VALUES (?,?,?,?,?,?,?)",
-                (
-                    p.entry_id,
-                    p.title,
-                    ", ".join(a.name for a in p.authors),
-                    p.summary,
-                    p.published.isoformat(),
-                    None,          #  ummary placeholder
-                    tags
-                ),
-            )
-            
-            # Add to search results
-            search_results.append({
-                'title': p.title,
-                'authors': ", ".join(a.name for a in p.authors),
-                'abstract': p.summary,
-                'published': p.published.isoformat()
-            })
-            papers_added += 1
-        
-        # Stop if enough papers have been added
-        if papers_added >= max_results:
+    query = build_query(**criteria)
+    conn  = get_conn()
+    new_papers = []  # papers from current search that aren't in database
+    seen = set()     # ids already considered (versions of a paper share one id)
+
+    # 1) fetch + dedup: one rate-limited API request and one DB query per page
+    #    (get more results than needed to filter from)
+    for page in timed_iter(iter_pages(query, max_results=max_results * 3), "scrape.fetch"):
+        with span("scrape.dedup"):
+            fresh = []
+            for p in page:
+                if p.id not in seen:
+                    seen.add(p.id)
+                    fresh.append(p)
+            stored = existing_ids(conn, (p.id for p in fresh))
+            new_papers += [p for p in fresh if p.id not in stored]
+        if len(new_papers) >= max_results:
             break
-            
-        time.sleep(1)
-    
-    conn.commit()
-    return search_results
+    new_papers = new_papers[:max_results]
+
+    # 2) tag: one encoder pass for the whole batch, shared by KeyBERT and the vector index
+    with span("scrape.tag"):
+        docs = [doc_text(p.title, p.summary) for p in new_papers]
+        embs = get_encoder().encode(docs, batch_size=TAG_BATCH_SIZE, normalize_embeddings=True) if docs else []
+        tags = make_tags_batch(docs, embs)
+
+    # 3) insert: one executemany; ids a concurrent scrape stored meanwhile are ignored
+    rows = [
+        (p.id, p.title, ", ".join(p.authors), p.summary, p.published,
+         None,          #  summary placeholder
+         t)
+        for p, t in zip(new_papers, tags)
+    ]
+    with span("scrape.insert"):
+        insert_papers(conn, rows, [p.categories for p in new_papers])
+        if new_papers:
+            add_vectors(conn, [p.id for p in new_papers], embs)
 
+    return [
+        {'id': pid, 'title': title, 'authors': authors, 'abstract': abstract, 'published': published}
+        for pid, title, authors, abstract, published, _, _ in rows
+    ]
@@ -6,7 +6,7 @@ Streamlit app for the research assistant.
 - Ideate: generate project ideas
 
 """
-import pathlib, tempfile
+import pathlib, tempfile, threading
 import os
 # set up for Hugging Face Spaces
 CACHE_DIR = pathlib.Path(tempfile.gettempdir()) / "hf_cache"
@@ -22,19 +22,83 @@ for var in (
     
 import streamlit as st
 from datetime import date
+import config
 from config     import MAX_RESULTS
 from scrape     import scrape
-from digest     import build_html
-from ideate     import ideate_from_topic, ideate_from_ids
-from helpers    import render_rows, rows_by_tag
-from db         import get_conn
-from summarise     import summarise_by_tag
+from digest     import count_papers, page_rows, write_html
+from ideate     import stream_ideas_from_topic, stream_ideas_from_ids
+from summarise  import stream_summary
+from helpers    import render_rows, rows_by_ids
+from search     import search_papers
+from vectors    import semantic_ids
+from db         import get_conn, load_text, set_summaries
+from jobs          import enqueue, progress
+from models        import model_stats, get_encoder
+from backends      import get_backend
+from llm_cache     import cache_stats
+import arxiv_cache
+import metrics
 
 
 
 st.set_page_config(page_title="Research Assistant", layout="wide")
+
+
+# heavy models load on first use, not at import: the page renders at once and
+# a session that only browses digests never loads them
+@st.cache_resource(show_spinner="Loading the embedding model...")
+def load_encoder():
+    return get_encoder()
+
+
+@st.cache_resource
+def metrics_server():
+    return metrics.start_server(config.METRICS_PORT)
+
+
+@st.cache_resource
+def app_worker():
+    # drains the summary queue with the app's own model, so an in-process
+    # backend is never loaded twice (once here, once in a worker process)
+    from worker import run
+    thread = threading.Thread(target=run, name="app-worker", daemon=True)
+    thread.start()
+    return thread
+
+
+if config.METRICS_PORT:
+    metrics_server()
+if config.APP_WORKER == "1" or (config.APP_WORKER == "auto" and not get_backend().concurrent):
+    app_worker()
+metrics.start_trace()                # spans of this rerun, for the timings panel
+
+
 tab1, tab2, tab3 = st.tabs(["🔍 Search", "📑 Digest", "💡 Ideate"])
 
+with st.sidebar.expander("Model"):
+    stats = model_stats()
+    st.caption(f"Backend: {get_backend().id}")
+    if not stats["models"] and config.LLM_BACKEND == "transformers":
+        st.caption("No model loaded yet; it loads on first Digest/Ideate.")
+    for name, s in stats["models"].items():
+        st.caption(f"**{name}** — loaded in {s['load_seconds']}s, "
+                   f"{s['model_mb'] or '?'} MB weights")
+    for name, g in stats["generation"].items():
+        st.caption(f"**{name}** — first token after {g['mean_ttft_s']}s, "
+                   f"done after {g['mean_total_s']}s (mean of {g['calls']})")
+    st.caption(f"Process RSS: {stats['rss_mb']} MB")
+    cache = cache_stats()
+    st.caption(f"LLM cache: {cache['hits']} hits, {cache['misses']} misses, "
+               f"{cache['entries']} entries ({cache['mb']} MB)")
+    api = arxiv_cache.cache_stats()
+    hits, misses = (sum(api.get(k, {}).get(n, 0) for k in ("query", "id"))
+                    for n in ("hits", "misses"))
+    st.caption(f"arXiv cache: {hits} hits, {misses} misses, "
+               f"{api['entries']} entries ({api['mb']} MB)")
+
+show_timings = st.sidebar.checkbox("Show timings", help="Time spent per stage in this run")
+timings      = st.sidebar.empty()
+
 
 with tab1:
     st.header("Search for papers you have not yet read")
@@ -45,56 +109,148 @@ with tab1:
     category = c4.text_input("Category (e.g. cs.CL)")
     k = st.slider("Max papers", 5, 50, 25)
     if st.button("Run search"):
+        load_encoder()
         with st.spinner("Finding new papers for your search..."):
             search_results = scrape(max_results=k, topic=topic, title=title,
                author=author, category=category)
-        
-        if search_results:
-            st.success(f"Found {len(search_results)} new papers for your search!")
-            # Convert search results to the format expected by render_rows
-            paper_rows = [(p['title'], p['authors'], p['abstract'], p['published']) 
-                         for p in search_results]
-            st.components.v1.html(render_rows(paper_rows), height=600, scrolling=True)
-        else:
-            st.info("No new papers found for this search. All recent papers on this topic are already in your database.")
+        # kept across reruns so paging doesn't search again
+        st.session_state["search_rows"] = [
+            (p['id'], p['title'], p['authors'], p['abstract'], p['published'])
+            for p in search_results]
+
+    paper_rows = st.session_state.get("search_rows")
+    if paper_rows:
+        st.success(f"Found {len(paper_rows)} new papers for your search!")
+        page_size = 10
+        pages = (len(paper_rows) + page_size - 1) // page_size
+        page  = st.number_input(f"Page (of {pages})", 1, pages, 1, key="search_page") if pages > 1 else 1
+        st.components.v1.html(render_rows(paper_rows[(page - 1) * page_size:page * page_size]),
+                              height=600, scrolling=True)
+    elif paper_rows is not None:
+        st.info("No new papers found for this search. All recent papers on this topic are already in your database.")
 
 
 with tab2:
     st.header("Get a digest from the latest papers you have previously scraped")
     d_topic = st.text_input("Keyword to match tags", value="large language")
-    if st.button("Generate digest"):
-        with st.spinner("Finding papers and summarising them..."):
-            summarise_by_tag(d_topic)
-    rows = rows_by_tag(d_topic, MAX_RESULTS)
+    d_semantic = st.checkbox("Match by meaning", key="digest_semantic",
+                             help="Rank papers by embedding similarity instead of keywords")
+    if d_semantic:
+        load_encoder()
+        d_ids = semantic_ids(d_topic, MAX_RESULTS)
+    else:
+        d_ids = [pid for pid, in search_papers(d_topic, MAX_RESULTS, fields="p.id")]
+
+    c1, c2 = st.columns(2)
+    if c1.button("Generate digest"):
+        # summaries are written by worker.py; we only queue the matching papers
+        enqueue(d_ids, priority=1)
+    c2.button("Refresh")
+
+    prog = progress(paper_ids=d_ids)
+    waiting = prog["pending"] + prog["claimed"]
+    if waiting:
+        total = prog["done"] + waiting
+        st.progress(prog["done"] / total,
+                    text=f"{prog['done']} summarised, {waiting} waiting for a worker")
+    if prog["failed"]:
+        st.warning(f"{prog['failed']} papers could not be summarised.")
+
+    waiting_ids = [pid for pid, in get_conn().execute(
+        f"SELECT id FROM papers WHERE summarised = 0 AND id IN ({','.join('?' * len(d_ids))})",
+        d_ids)] if d_ids else []
+    if waiting_ids and st.button("Summarise next paper now"):
+        pid, = waiting_ids[:1]
+        title, = get_conn().execute("SELECT title FROM papers WHERE id=?", (pid,)).fetchone()
+        abstract = load_text(get_conn(), [pid], "abstract")[pid]
+        st.markdown(f"**{title}**")
+        summary = st.write_stream(stream_summary(abstract))
+        conn = get_conn()
+        with conn:
+            set_summaries(conn, [(summary.strip(), pid)])
+
+    rows = [r for r in rows_by_ids(d_ids) if r[2] is not None]
     if not rows:
-        st.info("No papers found; try the Search tab.")
+        st.info("No summarised papers found; try the Search tab or generate a digest.")
     else:
         st.components.v1.html(render_rows(rows), height=800, scrolling=True)
 
+    st.subheader("Latest papers")
+    c1, c2, c3 = st.columns(3)
+    d_days = c1.number_input("Published in the last N days", 1, 3650, 2)
+    d_cats = [c.strip() for c in c2.text_input("Categories (comma-separated)").split(",") if c.strip()]
+    d_kw   = c3.text_input("Keyword", key="digest_window_kw")
+    c1, c2 = st.columns(2)
+    d_tags = [t.strip() for t in c1.text_input("Tags (comma-separated)").split(",") if t.strip()]
+    d_auth = c2.text_input("Author (full name)", key="digest_window_author")
+    window = dict(lookback_hours=24 * d_days, categories=d_cats, keyword=d_kw or None,
+                  tags=d_tags, author=d_auth or None)
+
+    n_papers = count_papers(**window)
+    if not n_papers:
+        st.info("No papers published in that window.")
+    else:
+        # keyset paging: cursors[i] is the (published, id) page i+1 starts after
+        page_size = 50
+        pages = (n_papers + page_size - 1) // page_size
+        state = st.session_state
+        if state.get("digest_window") != window:
+            state["digest_window"], state["digest_cursors"] = window, [None]
+        cursors = state["digest_cursors"]
+        rows, cursor = page_rows(**window, limit=page_size, after=cursors[-1])
+
+        c1, c2, c3 = st.columns([1, 1, 4])
+        if c1.button("Newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        if c2.button("Older", disabled=cursor is None or len(cursors) >= pages):
+            cursors.append(cursor)
+            st.rerun()
+        c3.caption(f"Page {len(cursors)} of {pages} ({n_papers} papers)")
+        st.components.v1.html(render_rows(rows), height=800, scrolling=True)
+
+        if st.button("Export whole digest"):
+            out = pathlib.Path(tempfile.gettempdir()) / f"digest_{date.today()}.html"
+            write_html(out, **window)
+            with open(out, "rb") as f:
+                st.download_button("Download HTML", f, file_name=out.name, mime="text/html")
+
 with tab3:
     st.header("Brainstorm new research ideas based on previously scraped papers")
     mode = st.radio("Context source", ["Keyword", "ArXiv IDs"])
 
     if mode == "Keyword":
         kw = st.text_input("Keyword")
+        i_semantic = st.checkbox("Match by meaning", key="ideate_semantic")
         if st.button("Ideate"):
-            with st.spinner("Thinking of new ideas..."):
-                ideas = ideate_from_topic(kw)
+            if i_semantic:
+                load_encoder()
+            with st.spinner("Collecting papers..."):
+                ideas = stream_ideas_from_topic(kw, semantic=i_semantic)
             if ideas is None:
                 st.info("No papers in the database match that keyword. "
                         "Try running a search in the **Search** tab first.")
             else:
-                st.markdown(f"```\n{ideas}\n```")
+                st.write_stream(ideas)
 
     else:
         ids_in = st.text_area("Comma-separated IDs",
                               placeholder="2406.01234,2405.01234")
         if st.button("Ideate"):
-            with st.spinner("Thinking of new ideas..."):
-                ids   = [x.strip() for x in ids_in.split(",") if x.strip()]
-                ideas = ideate_from_ids(ids)
+            ids   = [x.strip() for x in ids_in.split(",") if x.strip()]
+            ideas = stream_ideas_from_ids(ids)
             if ideas is None:
                 st.info("Those IDs aren't in the database yet. "
                         "Fetch them via the Search tab, then try again.")
             else:
-                st.markdown(f"```\n{ideas}\n```")
+                st.write_stream(ideas)
+
+
+spans = metrics.trace_summary(metrics.stop_trace())
+if show_timings:
+    with timings.container():
+        st.caption("Timings of this run")
+        for name, n, ms in spans:
+            st.caption(f"**{name}** — {ms} ms ({n} call{'s' if n > 1 else ''})")
+        if not spans:
+            st.caption("Nothing was timed.")
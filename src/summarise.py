@@ -1,12 +1,15 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from db import get_conn
-from config import MODEL_NAME
-from helpers    import rows_by_tag 
-import os
-import tempfile
-import pathlib
+import asyncio, logging
+from concurrent.futures import ThreadPoolExecutor
+import config
+from db import get_conn, set_summaries
+from models import get_pipe
+from backends   import get_backend
+from config import SUMMARY_BATCH_SIZE
+from search     import search_papers
+from llm_cache  import cache_key, cached_stream, lookup_many, store_many
 """ 
 Summarise the abstract of a paper using a LLM. Further versions should instead summarise the full paper.
+Generation runs on the configured backend (backends.py).
 """
 
 PROMPT = (
@@ -15,48 +18,169 @@ PROMPT = (
     "===ABSTRACT===\n{abstract}\n"
     "===SUMMARY===\n"
 )
+GEN_KWARGS = {"max_new_tokens": 150}
+
+log = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------- #
 def load_pipe():
-    cache_dir = pathlib.Path(tempfile.gettempdir()) / "hf_cache"
-    model = AutoModelForCausalLM.from_pretrained(
-        MODEL_NAME, 
-        cache_dir=cache_dir,
-        device_map="auto"
-    )
-    tok   = AutoTokenizer.from_pretrained(MODEL_NAME, cache_dir=cache_dir)
-    tok.pad_token = tok.eos_token
-    return pipeline(
-        "text-generation",
-        model=model,
-        tokenizer=tok,
-        do_sample=False,
-        return_full_text=False,
-    )
-
-
-def summarise_by_tag(keyword: str, limit: int = 10) -> int:
-    """
-    Generate summaries only for rows whose tags match `keyword`
-    AND whose summary is still NULL.
+    """
+    Return the in-process pipeline for config.MODEL_NAME. The model is loaded
+    once per process and shared by every caller (see models.py).
+    """
+    return get_pipe()
+
+
+def summarise_rows(rows, batch_size: int = None, backend=None):
+    """
+    Summarise (id, abstract) rows, `batch_size` prompts per backend call.
+    Abstracts summarised before are taken from the LLM cache (llm_cache.py);
+    the rest are sorted by length first so every batch pads (on the left)
+    to roughly the same length instead of to the longest abstract overall.
+    Returns (summary, id) pairs, ready for executemany.
+
+    Example:
+    summarise_rows([("2406.01234", "We propose ...")], batch_size=8)
+    """
+    backend    = backend or get_backend()
+    batch_size = batch_size or SUMMARY_BATCH_SIZE
+    prompts    = [PROMPT.format(abstract=abstract or "") for _, abstract in rows]
+    if not prompts:
+        return []
+
+    keys    = [cache_key(p, backend.id, **GEN_KWARGS) for p in prompts]
+    cached  = lookup_many(keys)
+    results = [(cached[k], row[0]) for k, row in zip(keys, rows) if k in cached]
+    order   = sorted((i for i, k in enumerate(keys) if k not in cached),
+                     key=lambda i: len(prompts[i]))
+
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        # each completion is cached as it arrives: if one prompt of the batch
+        # fails, the others are not generated (and paid for) again next time
+        texts  = backend.generate(
+            [prompts[i] for i in bucket], batch_size,
+            on_result=lambda j, text: store_many([(keys[bucket[j]], text)], backend.id),
+            **GEN_KWARGS)
+        results += [(text, rows[i][0]) for i, text in zip(bucket, texts)]
+    return results
+
+
+def stream_summary(abstract: str):
+    """
+    Summarise one abstract, yielding the summary text as it is generated.
+
+    Example:
+    summary = "".join(stream_summary("We propose ..."))
+    """
+    backend = get_backend()
+    return cached_stream(PROMPT.format(abstract=abstract or ""), backend.stream,
+                         model_name=backend.id, **GEN_KWARGS)
+
+
+async def summarise_rows_async(rows, concurrency: int = None, backend=None,
+                               on_results=None, commit_every: int = None):
+    """
+    Summarise (id, abstract) rows with up to `concurrency` (default
+    config.LLM_CONCURRENCY) requests in flight, for remote backends that batch
+    concurrent requests themselves (and retry overloaded requests, see
+    backends.py).
+    As summaries complete they are passed to on_results([(summary, id), ...])
+    `commit_every` at a time, so each batch can be committed right away.
+    Returns (results, failures) with failures as [(id, error), ...].
+    Raises ValueError for in-process backends (backend.concurrent is False):
+    use summarise_rows for those.
+
+    Example:
+    asyncio.run(summarise_rows_async(rows, 16, on_results=write))
+    """
+    backend      = backend or get_backend()
+    if not backend.concurrent:
+        raise ValueError(f"backend {backend.name!r} can't serve concurrent requests; "
+                         "use summarise_rows")
+    concurrency  = concurrency or config.LLM_CONCURRENCY
+    commit_every = commit_every or SUMMARY_BATCH_SIZE
+    prompts = [PROMPT.format(abstract=abstract or "") for _, abstract in rows]
+    keys    = [cache_key(p, backend.id, **GEN_KWARGS) for p in prompts]
+    cached  = lookup_many(keys)
+
+    results, failures, batch = [], [], []
+
+    def flush():
+        if batch:
+            store_many(((keys[i], text) for i, text in batch), backend.id)
+            done = [(text, rows[i][0]) for i, text in batch]
+            if on_results:
+                on_results(done)
+            results.extend(done)
+            batch.clear()
+
+    batch += [(i, cached[k]) for i, k in enumerate(keys) if k in cached]
+    flush()
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i, pool):
+        async with sem:
+            try:
+                loop = asyncio.get_running_loop()
+                text = await loop.run_in_executor(
+                    pool, lambda: backend.generate([prompts[i]], **GEN_KWARGS)[0])
+                return i, text, None
+            except Exception as e:
+                return i, None, e
+
+    # the HTTP client blocks, so requests run on their own threads; the
+    # semaphore keeps at most `concurrency` of them in flight
+    with ThreadPoolExecutor(concurrency) as pool:
+        for task in asyncio.as_completed([one(i, pool) for i, k in enumerate(keys) if k not in cached]):
+            i, text, error = await task
+            if error is not None:
+                failures.append((rows[i][0], error))
+                continue
+            batch.append((i, text))
+            if len(batch) >= commit_every:
+                flush()
+        flush()
+    return results, failures
+
+
+def _write(conn, summaries):
+    with conn:
+        set_summaries(conn, summaries)
+
+
+def summarise_by_tag(keyword: str, limit: int = 10, batch_size: int = None,
+                     concurrency: int = None) -> int:
+    """
+    Generate summaries only for rows matching `keyword` (full-text search,
+    see search.py) AND whose summary is still NULL.
+    Rows are generated `batch_size` at a time (default config.SUMMARY_BATCH_SIZE)
+    and written back in a single transaction. With `concurrency` > 1 they are
+    sent as that many concurrent requests instead (summarise_rows_async) and
+    written `batch_size` at a time as they complete (papers that still fail
+    after retries are logged and left pending); in-process backends ignore
+    `concurrency`.
     Returns number of rows updated.
     """
-    pipe = load_pipe()
     conn = get_conn()
 
-    # 1) get IDs + abstracts for matching rows with summary IS NULL
-    like = f"%{keyword.lower()}%"
-    rows = conn.execute(
-        "SELECT id, abstract FROM papers "
-        "WHERE summary IS NULL AND LOWER(tags) LIKE ? "
-        "ORDER BY published DESC LIMIT ?", (like, limit)
-    ).fetchall()
-
-    # 2) run the LLM only on those
-    for id, abstract in rows:
-        out = pipe(PROMPT.format(abstract=abstract), max_new_tokens=150)[0]['generated_text']
-        conn.execute("UPDATE papers SET summary=? WHERE id=?", (out.strip(), id))
-
-    conn.commit()
-    return len(rows)
+    # 1) get IDs + abstracts for the best matching rows not yet summarised
+    rows = search_papers(keyword, limit, fields="p.id, unpack(t.abstract)",
+                         where="AND p.summarised = 0", conn=conn)
+
+    if concurrency and concurrency > 1 and get_backend().concurrent:
+        summaries, failures = asyncio.run(summarise_rows_async(
+            rows, concurrency, on_results=lambda done: _write(conn, done),
+            commit_every=batch_size))
+        for pid, error in failures:
+            log.warning("summary of %s failed: %r", pid, error)
+        return len(summaries)
+
+    # 2) run the LLM only on those, in length-bucketed batches
+    summaries = summarise_rows(rows, batch_size)
+
+    # 3) write everything back in one transaction
+    _write(conn, summaries)
+    return len(summaries)
 
@@ -0,0 +1,172 @@
+"""
+Semantic index of paper embeddings (all-MiniLM-L6-v2 over "title. abstract").
+
+Embeddings are L2-normalised and stored as float16 rows in a flat file next to
+the database (`papers.db.vec`, 768 bytes per paper), so cosine similarity is a
+plain dot product. Row r of the file belongs to `paper_vectors.row = r`.
+Search memory-maps the file and scores it chunk by chunk with a matmul and
+argpartition, so 500k papers never become Python objects.
+
+Example:
+add_vectors(conn, ["2406.01234"], get_encoder().encode(["Title. Abstract"]))
+semantic_ids("protein structure prediction", k=10)
+python src/vectors.py --backfill        # embed papers scraped before the index existed
+"""
+import contextlib
+import numpy as np
+import config
+from db import get_conn
+
+DIM       = 384                     # all-MiniLM-L6-v2
+DTYPE     = np.float16
+ROW_BYTES = DIM * np.dtype(DTYPE).itemsize
+CHUNK     = 16384                   # rows scored per matmul (~25 MB as float32)
+
+try:
+    import fcntl
+except ImportError:                 # Windows: single writer assumed
+    fcntl = None
+
+
+def vec_path():
+    return config.DB_PATH.with_name(config.DB_PATH.name + ".vec")
+
+
+@contextlib.contextmanager
+def _locked(f):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        yield f
+    finally:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _normalise(vecs):
+    vecs  = np.asarray(vecs, dtype=np.float32).reshape(-1, DIM)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-12)
+
+
+def doc_text(title, abstract) -> str:
+    """
+    The text a paper is embedded from (shared with KeyBERT tagging).
+    """
+    return f"{title}. {abstract}"
+
+
+def add_vectors(conn, paper_ids, embeddings) -> int:
+    """
+    Append embeddings for papers that have none yet. Commits.
+    Returns the number of vectors written.
+    """
+    if not len(paper_ids):
+        return 0
+    vecs = _normalise(embeddings).astype(DTYPE)
+    path = vec_path()
+    with open(path, "ab+") as f, _locked(f):
+        have = {pid for pid, in conn.execute(
+            f"SELECT paper_id FROM paper_vectors WHERE paper_id IN ({','.join('?' * len(paper_ids))})",
+            list(paper_ids))}
+        keep = [i for i, pid in enumerate(paper_ids) if pid not in have]
+        if not keep:
+            return 0
+        start = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM paper_vectors").fetchone()[0]
+        # drop rows left behind by a writer that crashed before committing
+        f.truncate(start * ROW_BYTES)
+        f.write(vecs[keep].tobytes())
+        f.flush()
+        with conn:
+            conn.executemany(
+                "INSERT INTO paper_vectors(row, paper_id) VALUES (?, ?)",
+                [(start + j, paper_ids[i]) for j, i in enumerate(keep)]
+            )
+    return len(keep)
+
+
+def _matrix(conn):
+    n = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM paper_vectors").fetchone()[0]
+    if vec_path().exists():
+        n = min(n, vec_path().stat().st_size // ROW_BYTES)
+    if n == 0 or not vec_path().exists():
+        return None
+    return np.memmap(vec_path(), dtype=DTYPE, mode="r", shape=(n, DIM))
+
+
+def _top_k(scores, k):
+    if len(scores) <= k:
+        return np.arange(len(scores))
+    return np.argpartition(-scores, k - 1)[:k]
+
+
+def search_vectors(query_vec, k: int = 10, conn=None):
+    """
+    The `k` papers whose embeddings are closest (cosine) to `query_vec`.
+    Returns [(paper_id, score), ...], best first.
+    """
+    conn = conn or get_conn()
+    mat  = _matrix(conn)
+    if mat is None or k <= 0:
+        return []
+    q = _normalise(query_vec)[0]
+
+    rows, scores = [], []
+    for start in range(0, len(mat), CHUNK):
+        s   = np.asarray(mat[start:start + CHUNK], dtype=np.float32) @ q
+        idx = _top_k(s, k)
+        rows.append(idx + start)
+        scores.append(s[idx])
+    rows, scores = np.concatenate(rows), np.concatenate(scores)
+    best  = _top_k(scores, k)
+    best  = best[np.argsort(-scores[best])]
+
+    ids = dict(conn.execute(
+        f"SELECT row, paper_id FROM paper_vectors WHERE row IN ({','.join('?' * len(best))})",
+        [int(r) for r in rows[best]]
+    ))
+    return [(ids[int(r)], float(sc)) for r, sc in zip(rows[best], scores[best]) if int(r) in ids]
+
+
+def semantic_ids(text: str, k: int = 10, conn=None):
+    """
+    Ids of the `k` papers closest in meaning to `text`, best first.
+
+    Example:
+    semantic_ids("making transformers cheaper at inference time")
+    """
+    if not text or not text.strip():
+        return []
+    from models import get_encoder
+    query = get_encoder().encode([text], normalize_embeddings=True)
+    return [pid for pid, _ in search_vectors(query, k, conn)]
+
+
+def backfill(batch_size: int = 256) -> int:
+    """
+    Embed every paper that has no vector yet. Returns the number embedded.
+    """
+    from models import get_encoder
+    conn = get_conn()
+    done = 0
+    while True:
+        rows = conn.execute(
+            "SELECT p.id, p.title, unpack(t.abstract) FROM papers p "
+            "LEFT JOIN paper_text t ON t.paper_id = p.id WHERE p.id NOT IN "
+            "(SELECT paper_id FROM paper_vectors) LIMIT ?", (batch_size,)
+        ).fetchall()
+        if not rows:
+            return done
+        embs  = get_encoder().encode([doc_text(t, a) for _, t, a in rows],
+                                     batch_size=batch_size, normalize_embeddings=True)
+        done += add_vectors(conn, [pid for pid, _, _ in rows], embs)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Maintain the semantic paper index.")
+    ap.add_argument("--backfill", action="store_true", help="embed papers without a vector")
+    ap.add_argument("--batch-size", type=int, default=256)
+    args = ap.parse_args()
+    if args.backfill:
+        print(f"embedded {backfill(args.batch_size)} papers")
@@ -0,0 +1,101 @@
+"""
+Background summarisation worker.
+
+Drains papers whose summary is NULL through the `summary_jobs` queue (jobs.py)
+so the Streamlit app never has to generate summaries itself. Run one or more
+next to the app; they can share the same database:
+
+    python src/worker.py               # keep polling for new papers
+    python src/worker.py --once        # drain the queue, then exit
+    python src/worker.py --batch-size 16
+
+With a remote inference server (LLM_BACKEND=openai, see backends.py) use
+--concurrency to keep that many requests in flight; summaries are committed
+--batch-size at a time as they complete. Summarising everything that is
+pending is then
+
+    python src/worker.py --once --concurrency 32
+
+--metrics-port serves the worker's metrics (generation tokens/s, query
+timings, see metrics.py) for Prometheus.
+"""
+import argparse, asyncio, os, socket, time
+import config
+import metrics
+from config    import SUMMARY_BATCH_SIZE
+from db        import get_conn
+from jobs      import enqueue_pending, claim, complete, fail
+
+
+def _run_async(worker, jobs, batch_size, concurrency, conn) -> int:
+    from summarise import summarise_rows_async
+
+    results, failures = asyncio.run(summarise_rows_async(
+        jobs, concurrency, on_results=lambda done: complete(worker, done, conn=conn),
+        commit_every=batch_size))
+    for pid, error in failures:
+        print(f"[worker {worker}] {pid} failed: {error!r}")
+        fail(worker, [pid], repr(error), conn=conn)
+    return len(results)
+
+
+def run(batch_size: int = SUMMARY_BATCH_SIZE, poll: float = 5.0, once: bool = False,
+        concurrency: int = 1) -> int:
+    """
+    Claim, summarise and store jobs until the queue is empty (`once`) or forever.
+    With `concurrency` > 1, `concurrency` requests are sent at once
+    (summarise_rows_async) and 4x as many jobs are claimed per round; with an
+    in-process backend it is ignored.
+    Returns the number of summaries written.
+    """
+    from summarise import summarise_rows   # loads the LLM stack only when we run
+    from backends import get_backend
+
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    if concurrency > 1 and not get_backend().concurrent:
+        print(f"[worker {worker}] backend {config.LLM_BACKEND!r} runs in-process: "
+              "ignoring --concurrency, summarising in batches")
+        concurrency = 1
+    conn   = get_conn()
+    done   = 0
+    while True:
+        jobs = claim(worker, batch_size if concurrency <= 1 else 4 * concurrency, conn=conn)
+        if not jobs:
+            # pick up papers scraped since the last pass before going idle
+            if enqueue_pending(conn=conn):
+                continue
+            if once:
+                return done
+            time.sleep(poll)
+            continue
+
+        if concurrency > 1:
+            done += _run_async(worker, jobs, batch_size, concurrency, conn)
+            print(f"[worker {worker}] {done} summaries written")
+            continue
+
+        try:
+            results = summarise_rows(jobs, batch_size)
+        except Exception as e:
+            print(f"[worker {worker}] batch failed: {e!r}")
+            fail(worker, [pid for pid, _ in jobs], repr(e), conn=conn)
+            continue
+        complete(worker, results, conn=conn)
+        done += len(results)
+        print(f"[worker {worker}] {done} summaries written")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Summarise pending papers in the background.")
+    ap.add_argument("--batch-size", type=int, default=SUMMARY_BATCH_SIZE)
+    ap.add_argument("--poll", type=float, default=5.0, help="seconds to wait when idle")
+    ap.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    ap.add_argument("--concurrency", type=int,
+                    default=config.LLM_CONCURRENCY if config.LLM_BACKEND == "openai" else 1,
+                    help="concurrent requests to the LLM server")
+    ap.add_argument("--metrics-port", type=int, default=config.METRICS_PORT,
+                    help="serve Prometheus metrics on this port (0: off)")
+    args = ap.parse_args()
+    if args.metrics_port:
+        metrics.start_server(args.metrics_port)
+    run(args.batch_size, args.poll, args.once, args.concurrency)